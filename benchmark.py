@@ -0,0 +1,216 @@
+"""Benchmarks of the WhatsApp Web automation.
+
+python benchmark.py chrome [--runs N]
+    Compare the launch time, WhatsApp Web load time and memory usage of the Chrome option modes of create_chromedriver_options ("default" and "performance"). Memory is only reported when psutil is installed.
+
+python benchmark.py pipeline [--contacts N ...] [--latency S] [--mode MODE] [--no-photo]
+    Run the whole send pipeline (loading the contacts from MongoDB, downloading the meme from Blob Storage, then a text and a photo per contact) offline against the fake WhatsApp Web page of fake_whatsapp.py, an in-memory Blob Storage and mongomock, and report the messages per minute and the per-step latencies for each contact list size. Needs selenium, Chrome, azure-core and mongomock, but no phone, WhatsApp account or Azure subscription, so it can be run before and after a change to catch regressions.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+from time import perf_counter
+import util as u
+from const import STEP_TIMEOUTS
+from fake_whatsapp import FakeWhatsAppServer, FakeBlobServiceClient
+from metrics import metrics
+
+CHROME_MODES = ["default", "performance"]
+# The chat list is rendered once WhatsApp Web has finished loading for a logged-in profile.
+WHATSAPP_LOADED_SELECTOR = "#side, #pane-side"
+
+
+def chrome_memory_mb(driver):
+    """Sum the resident memory of chromedriver and every Chrome process it started.
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver object.
+
+    Returns:
+        float: memory in MB, or None if psutil is not installed.
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+    root = psutil.Process(driver.service.process.pid)
+    processes = [root] + root.children(recursive=True)
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+
+def measure_chrome_mode(mode: str, runs: int):
+    """Launch Chrome with the options of a mode, load WhatsApp Web and measure it.
+
+    Args:
+        mode (str): "default" or "performance".
+        runs (int): number of launches to measure.
+
+    Returns:
+        dict: lists of launch times (s), load times (s) and memory (MB) per run.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.wait import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    results = {"launch": [], "load": [], "memory": []}
+    for _ in range(runs):
+        start = perf_counter()
+        driver = webdriver.Chrome(options=u.create_chromedriver_options(mode=mode))
+        launched = perf_counter()
+        try:
+            driver.get("https://web.whatsapp.com")
+            WebDriverWait(driver, STEP_TIMEOUTS["chat_load"] * 3).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, WHATSAPP_LOADED_SELECTOR)))
+            loaded = perf_counter()
+            results["launch"].append(launched - start)
+            results["load"].append(loaded - launched)
+            memory = chrome_memory_mb(driver)
+            if memory is not None:
+                results["memory"].append(memory)
+        finally:
+            driver.quit()
+    return results
+
+
+def compare_chrome_modes(runs: int):
+    """Measure every Chrome mode and print a comparison table.
+
+    Args:
+        runs (int): number of launches per mode.
+    """
+    print(f"{'mode':<12}{'launch (s)':>12}{'load (s)':>12}{'memory (MB)':>14}")
+    for mode in CHROME_MODES:
+        results = measure_chrome_mode(mode, runs)
+        memory = f"{statistics.median(results['memory']):.0f}" if results["memory"] else "n/a"
+        print(f"{mode:<12}{statistics.median(results['launch']):>12.2f}{statistics.median(results['load']):>12.2f}{memory:>14}")
+
+
+def make_contact_document(count: int):
+    """Build a contact document ("document" storage mode) with a given number of contacts.
+
+    Args:
+        count (int): number of contacts.
+
+    Returns:
+        dict: the contact details keyed by contact key.
+    """
+    tags = ["work", "friend", "family"]
+    return {
+        f"contact_{i:05d}": {
+            "name": f"Contact {i}",
+            "number": f"+6590{i:06d}",
+            "bday": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "tag": tags[i % len(tags)],
+        }
+        for i in range(1, count + 1)
+    }
+
+
+def run_pipeline(count: int, base_url: str, mode: str, photo: bool):
+    """Send a text (and a photo) to a freshly generated contact list through the fake WhatsApp Web page and measure it.
+
+    Args:
+        count (int): number of contacts.
+        base_url (str): URL of the fake WhatsApp Web page.
+        mode (str): Chrome option mode, "default" or "performance".
+        photo (bool): whether a photo is sent along with the text.
+
+    Returns:
+        dict: number of messages sent and failed, the send time (s, without the Chrome launch) and the per-step summary of the metrics.
+    """
+    metrics.reset()
+    collection = u.get_collection()
+    collection.delete_many({})
+    collection.insert_one(make_contact_document(count))
+
+    users = u.generate_users_from_mongodb()
+    photo_path = u.get_image_from_blob() if photo else None
+
+    def make_job(user):
+        done = set()
+        return user, lambda session, user: u.compose_msg(user, session=session, text="Happy birthday!", photo=photo_path, done=done)
+
+    with u.WhatsAppSession(mode=mode, base_url=base_url) as session:
+        session.start()
+        start = perf_counter()
+        report = u.run_send_jobs([make_job(user) for user in users], session=session, workers=1)
+        elapsed = perf_counter() - start
+    return {"sent": len(report.sent), "failed": len(report.failed), "seconds": elapsed, "steps": metrics.summary()}
+
+
+def benchmark_pipeline(counts: list, latency: float, mode: str, photo: bool):
+    """Run the offline send pipeline for every contact list size and print the throughput and per-step latencies.
+
+    The run happens in a temporary working directory, so the Chrome profile, blob cache and send files of the real resources directory are left untouched.
+
+    Args:
+        counts (list): contact list sizes e.g., [10, 100, 1000].
+        latency (float): seconds every step of the fake page takes.
+        mode (str): Chrome option mode, "default" or "performance".
+        photo (bool): whether a photo is sent along with the text.
+    """
+    try:
+        import mongomock
+    except ImportError:
+        print("The pipeline benchmark needs mongomock: pip install mongomock")
+        return
+    os.environ.setdefault("AZURE_MONGODB_DB", "benchmark")
+    os.environ.setdefault("AZURE_MONGODB_COLLECTION", "contacts")
+    fake_meme = b"\xff\xd8\xff\xe0" + bytes(4096) + b"\xff\xd9"
+    # Registered before anything asks for them, so every function of util gets the stand-ins from the client registry.
+    u.get_shared_client("mongo", mongomock.MongoClient)
+    u.get_shared_client("blob", lambda: FakeBlobServiceClient({("images", "bday1.jpg"): fake_meme}))
+
+    cwd = os.getcwd()
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, FakeWhatsAppServer(latency=latency) as server:
+        os.chdir(workdir)
+        os.makedirs("resources")
+        try:
+            for count in counts:
+                print(f"Sending to {count} contacts...")
+                results[count] = run_pipeline(count, server.url, mode, photo)
+        finally:
+            os.chdir(cwd)
+            u.close_clients()
+
+    print(f"\n{'contacts':>10}{'sent':>8}{'failed':>8}{'time (s)':>12}{'msgs/min':>12}")
+    for count, result in results.items():
+        per_minute = result["sent"] / result["seconds"] * 60 if result["seconds"] else 0
+        print(f"{count:>10}{result['sent']:>8}{result['failed']:>8}{result['seconds']:>12.1f}{per_minute:>12.1f}")
+    for count, result in results.items():
+        print(f"\nStep latencies for {count} contacts")
+        print(f"{'step':<24}{'count':>8}{'p50 (s)':>10}{'p95 (s)':>10}{'max (s)':>10}")
+        for name, stats in sorted(result["steps"].items()):
+            print(f"{name:<24}{stats['count']:>8}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['max']:>10.3f}")
+
+
+def main():
+    """Benchmark entry point.
+    """
+    parser = argparse.ArgumentParser(description="Benchmarks of the WhatsApp Web automation.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    chrome = subparsers.add_parser("chrome", help="compare the launch time and memory of the Chrome option modes")
+    chrome.add_argument("--runs", type=int, default=3, help="launches per mode (the median is reported)")
+    pipeline = subparsers.add_parser("pipeline", help="measure the send pipeline offline against a fake WhatsApp Web page")
+    pipeline.add_argument("--contacts", type=int, nargs="+", default=[10, 100, 1000], help="contact list sizes to measure")
+    pipeline.add_argument("--latency", type=float, default=0.2, help="seconds every step of the fake page takes")
+    pipeline.add_argument("--mode", choices=CHROME_MODES, default="performance", help="Chrome option mode")
+    pipeline.add_argument("--no-photo", action="store_true", help="only send the text message")
+    args = parser.parse_args()
+    if args.benchmark == "chrome":
+        compare_chrome_modes(args.runs)
+    elif args.benchmark == "pipeline":
+        benchmark_pipeline(args.contacts, args.latency, args.mode, photo=not args.no_photo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Provides a local cache for the files downloaded from Azure Blob Storage (memes, messages, documents).
+
+Files are stored under their content hash and indexed by "container/blob". When a cached blob is requested again, only a conditional request is sent to Azure (If-None-Match with the cached ETag), so an unchanged blob is never downloaded twice. The cache is bounded in size and evicts the least recently used files first.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceNotModifiedError
+from const import BLOB_CACHE_DIR, BLOB_CACHE_MAX_BYTES
+
+INDEX_NAME = "index.json"
+
+
+class BlobCache:
+    """Content-addressed, size-bounded LRU cache of blobs on the local disk.
+    """
+
+    def __init__(self, cache_dir=BLOB_CACHE_DIR, max_bytes=BLOB_CACHE_MAX_BYTES):
+        """
+        Args:
+            cache_dir (str, optional): directory holding the cached files and the index. Defaults to BLOB_CACHE_DIR.
+            max_bytes (int, optional): total size the cached files may take before the least recently used are evicted. Defaults to BLOB_CACHE_MAX_BYTES.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, INDEX_NAME)
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self.load_index()
+
+    def load_index(self):
+        """Read the cache index from disk.
+
+        Returns:
+            dict: cache entries keyed by "container/blob".
+        """
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_index(self):
+        """Write the cache index to disk, replacing the old one atomically.
+        """
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def path_of(self, entry: dict):
+        return os.path.join(self.cache_dir, entry["file"])
+
+    def fetch(self, blob_service_client, container_name: str, blob_name: str):
+        """Return the local path of a blob, downloading it only if it is not cached or has changed in Azure.
+
+        If Azure cannot be reached, the cached copy (if any) is returned.
+
+        Args:
+            blob_service_client (BlobServiceClient): The Blob service client.
+            container_name (str): Name of the Blob container.
+            blob_name (str): Name of the blob.
+
+        Returns:
+            str: path to the cached file.
+        """
+        key = f"{container_name}/{blob_name}"
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is not None and not os.path.exists(self.path_of(entry)):
+                entry = None
+        blob_client = blob_service_client.get_blob_client(container=container_name, blob=blob_name)
+        try:
+            if entry is None:
+                downloader = blob_client.download_blob()
+            else:
+                downloader = blob_client.download_blob(etag=entry["etag"], match_condition=MatchConditions.IfModified)
+            content = downloader.readall()
+        except ResourceNotModifiedError:
+            print(f"\nUsing cached blob {key}")
+            return self.touch(key)
+        except Exception as e:
+            if entry is None:
+                raise
+            print(f"\nCould not revalidate blob {key}, using cached copy: {e}")
+            return self.touch(key)
+
+        print(f"\nDownloaded blob {key} to cache")
+        return self.store(key, content, etag=downloader.properties.etag, last_modified=downloader.properties.last_modified)
+
+    def touch(self, key: str):
+        """Mark a cached blob as just used.
+
+        Args:
+            key (str): "container/blob" key of the blob.
+
+        Returns:
+            str: path to the cached file.
+        """
+        with self.lock:
+            entry = self.index[key]
+            entry["last_access"] = time.time()
+            self.save_index()
+            return self.path_of(entry)
+
+    def store(self, key: str, content: bytes, etag: str, last_modified=None):
+        """Save downloaded content under its hash and evict old files if the cache is over its size limit.
+
+        Args:
+            key (str): "container/blob" key of the blob.
+            content (bytes): the blob's content.
+            etag (str): the blob's ETag, used to revalidate it next time.
+            last_modified (datetime, optional): the blob's last modified time. Defaults to None.
+
+        Returns:
+            str: path to the cached file.
+        """
+        extension = os.path.splitext(key)[1]
+        file_name = hashlib.sha256(content).hexdigest() + extension
+        with self.lock:
+            path = os.path.join(self.cache_dir, file_name)
+            if not os.path.exists(path):
+                # A file under its hash name is always complete, even if the program dies while writing it.
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            self.index[key] = {
+                "file": file_name,
+                "etag": etag,
+                "last_modified": last_modified.isoformat() if last_modified else None,
+                "size": len(content),
+                "last_access": time.time(),
+            }
+            self.evict(keep=key)
+            self.save_index()
+            return path
+
+    def evict(self, keep: str):
+        """Remove the least recently used blobs until the cache fits in max_bytes. Must be called with the lock held.
+
+        Args:
+            keep (str): key of a blob that must not be evicted (the one being stored).
+        """
+        files = {entry["file"]: entry["size"] for entry in self.index.values()}
+        total = sum(files.values())
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            del self.index[key]
+            # Several blobs with the same content share one file.
+            if all(other["file"] != entry["file"] for other in self.index.values()):
+                total -= files[entry["file"]]
+                if os.path.exists(self.path_of(entry)):
+                    os.unlink(self.path_of(entry))
@@ -2,8 +2,169 @@ import os
 
 CONTACT_PATH_LOCAL = "resources/contacts.json"
 DOCUMENT_ID = os.getenv("AZURE_MONGODB_CONTACT_DOC_ID")
-TEMP_PATH = os.getenv("TEMP_PATH")
+# "document": every contact is a field of one document (DOCUMENT_ID). "per_contact": every contact is its own document in CONTACT_COLLECTION (see migrate.py).
+CONTACT_STORAGE_MODE = os.getenv("AZURE_MONGODB_STORAGE_MODE", "document")
+CONTACT_COLLECTION = os.getenv("AZURE_MONGODB_CONTACT_COLLECTION", "contacts")
+# Contacts fetched per round trip when streaming them from MongoDB.
+MONGO_BATCH_SIZE = int(os.getenv("AZURE_MONGODB_BATCH_SIZE", "500"))
+# Connection pools and timeouts (seconds) of the shared Azure clients.
+MONGO_MAX_POOL_SIZE = int(os.getenv("AZURE_MONGODB_MAX_POOL_SIZE", "10"))
+BLOB_MAX_POOL_SIZE = int(os.getenv("AZURE_BLOB_MAX_POOL_SIZE", "10"))
+AZURE_CONNECT_TIMEOUT = float(os.getenv("AZURE_CONNECT_TIMEOUT", "10"))
+AZURE_READ_TIMEOUT = float(os.getenv("AZURE_READ_TIMEOUT", "60"))
 PATH_TO_RESOURCES = "./resources"
+BLOB_CACHE_DIR = os.path.join(PATH_TO_RESOURCES, "cache")
+BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+PHOTO_PATH = "resources/bday_memeDOWNLOAD.jpg"
+# Birthday message template in the Blob "text" container (see template.py for the placeholders). Holiday templates are listed in holiday_calendar.py.
+BDAY_TEMPLATE_BLOB = "msg.txt"
+DOC_PATH = "resources/notice.pdf"
+# Resized/compressed variants of the photos are cached here by content hash (see media.py).
+MEDIA_CACHE_DIR = os.path.join(PATH_TO_RESOURCES, "media")
+MEDIA_MAX_SIDE = int(os.getenv("WPP_MEDIA_MAX_SIDE", "1600"))
+MEDIA_JPEG_QUALITY = int(os.getenv("WPP_MEDIA_JPEG_QUALITY", "80"))
+# Birthday photo per contact tag, as blob names in the "images" container. Contacts with any other tag get the default birthday photo (PHOTO_PATH).
+BDAY_PHOTOS_BY_TAG = {}
 TAGS = ["work", "friend", "family", "all"]
 CONTACT_KEY_NAME = "resources/js.key"
-MSG_KEY_NAME = "resources/msg.key"
\ No newline at end of file
+MSG_KEY_NAME = "resources/msg.key"
+PROFILE_PATH = os.path.join("profile", "wpp")
+# "default": maximized, headed browser. "performance": headless and resource-trimmed browser for unattended runs.
+CHROME_MODE = os.getenv("WPP_CHROME_MODE", "default")
+# Base URL of WhatsApp Web; benchmark.py points it to a local fake page.
+WHATSAPP_WEB_URL = os.getenv("WPP_WHATSAPP_WEB_URL", "https://web.whatsapp.com")
+CHROME_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36"
+JOURNAL_PATH = "resources/bday_updates.journal"
+SEND_QUEUE_PATH = "resources/send_queue.db"
+# Planning stage (see planner.py): country code of national numbers starting with 0 (e.g., "61"), numbers WhatsApp reported as not registered and how long they are skipped for, and WPP_DRY_RUN=1 to print the plans without sending.
+DEFAULT_COUNTRY_CODE = os.getenv("WPP_DEFAULT_COUNTRY_CODE")
+UNREGISTERED_PATH = "resources/unregistered_numbers.json"
+UNREGISTERED_TTL_DAYS = float(os.getenv("WPP_UNREGISTERED_TTL_DAYS", "30"))
+DRY_RUN = os.getenv("WPP_DRY_RUN") == "1"
+# Schedule of the campaigns run by daemon.py, and the time each of them last ran.
+JOBS_PATH = os.getenv("WPP_JOBS_PATH", "resources/jobs.json")
+DAEMON_STATE_PATH = "resources/daemon_state.json"
+# Step timings and counters of a run are written here; use a ".prom" extension for Prometheus text instead of JSON.
+METRICS_PATH = os.getenv("WPP_METRICS_PATH", "resources/metrics.json")
+# Number of Chrome instances sending at the same time (1 sends sequentially with a single browser) and the global send rate of all of them together.
+MAX_WORKERS = int(os.getenv("WPP_MAX_WORKERS", "1"))
+SENDS_PER_MINUTE = float(os.getenv("WPP_SENDS_PER_MINUTE", "20"))
+# Most chats WhatsApp Web lets one message be forwarded to at once.
+FORWARD_LIMIT = 5
+# Attempts per recipient for transient failures, and the delay (seconds) before the 1st retry, doubled for every further retry.
+SEND_MAX_ATTEMPTS = int(os.getenv("WPP_SEND_MAX_ATTEMPTS", "3"))
+SEND_RETRY_BASE_DELAY = float(os.getenv("WPP_SEND_RETRY_BASE_DELAY", "2"))
+
+# Seconds each step of a send may take before giving up. A step finishes as soon as the page confirms it, so these are upper bounds rather than fixed delays.
+STEP_TIMEOUTS = {
+    "chat_load": 20,        # opening a chat until its composer/buttons are usable
+    "attach_menu": 10,      # "+" menu items and the file input
+    "upload_preview": 17,   # photo/document preview rendered and ready to send
+    "send_confirm": 30,     # new message bubble shows a sent tick instead of the pending clock
+}
+
+# Versioned registry of the CSS selectors of WhatsApp Web elements. Each element has ordered fallbacks: the class-chain selector of the WhatsApp Web build the code was written against first, then selectors on attributes that survive redeploys (aria-label, data-icon, role, input accept). A resources/selectors.json file with the same layout ({"version": ..., "selectors": {...}}) takes precedence, so selectors can be fixed without a code change.
+SELECTOR_VERSION = "2024.06"
+SELECTORS_OVERRIDE_PATH = "resources/selectors.json"
+_ATTACH_MENU = "#main > footer > div._2lSWV._3cjY2.copyable-area > div > span:nth-child(2) > div > div._2xy_p._1bAtO > div._1OT67 > div > span > div > ul > div"
+SELECTORS = {
+    "plus_btn": [
+        "#main > footer > div._2lSWV._3cjY2.copyable-area > div > span:nth-child(2) > div > div._2xy_p._1bAtO > div._1OT67 > div > div",
+        "#main footer div[title='Attach']",
+        "#main footer button[aria-label='Attach']",
+        "#main footer span[data-icon='plus']",
+        "#main footer span[data-icon='attach-menu-plus']",
+        "#main footer span[data-icon='clip']",
+    ],
+    "send_btn": [
+        "#main > footer > div._2lSWV._3cjY2.copyable-area > div > span:nth-child(2) > div > div._1VZX7 > div._2xy_p._3XKXx > button",
+        "#main footer button[aria-label='Send']",
+        "#main footer span[data-icon='send']",
+    ],
+    "attach_photos_btn": [
+        f"{_ATTACH_MENU} > div:nth-child(2) > li > div",
+        "li[aria-label='Photos & videos'] > div",
+        "li span[data-icon='attach-image']",
+        "li span[data-icon='media-multiple']",
+    ],
+    "attach_photos_input": [
+        f"{_ATTACH_MENU} > div:nth-child(2) > li > div > input[type=file]",
+        "input[type='file'][accept*='image']",
+    ],
+    "attach_document_btn": [
+        f"{_ATTACH_MENU} > div:nth-child(1) > li > div",
+        "li[aria-label='Document'] > div",
+        "li span[data-icon='attach-document']",
+        "li span[data-icon='document-filled-refreshed']",
+    ],
+    "attach_document_input": [
+        f"{_ATTACH_MENU} > div:nth-child(1) > li > div > input[type=file]",
+        "input[type='file'][accept='*']",
+    ],
+    "invalid_number_popup": [
+        "div[data-animate-modal-popup='true']",
+        "div[role='dialog']",
+    ],
+    "caption_box": [
+        "div[contenteditable='true'][aria-label='Add a caption']",
+        "div[contenteditable='true'][data-tab='10']",
+        "div[role='textbox'][aria-placeholder='Add a caption']",
+    ],
+    "preview_send_btn": [
+        "#app > div > div.two._1jJ70 > div._2QgSC > div._2Ts6i._2xAQV > span > div > span > div > div > div.g0rxnol2.thghmljt.p357zi0d.rjo8vgbg.ggj6brxn.f8m0rgwh.gfz4du6o.r7fjleex.bs7a17vp > div > div.O2_ew > div._3wFFT > div > div",
+        "div[role='button'][aria-label='Send']",
+        "#app span[data-icon='send']:not(#main footer span)",
+    ],
+    # Broadcast (see util.run_broadcast and util.send_to_group). {title} is filled in with the name of the chat as a CSS string (see util.css_string).
+    "composer": [
+        "#main footer div[contenteditable='true'][role='textbox']",
+        "#main footer div[contenteditable='true'][data-tab='10']",
+    ],
+    "chat_search_box": [
+        "#side div[contenteditable='true'][role='textbox']",
+        "#side div[contenteditable='true'][data-tab='3']",
+    ],
+    "chat_search_result": [
+        "#pane-side span[title={title}]",
+        "div[role='grid'] span[title={title}]",
+    ],
+    "msg_context_menu": [
+        "#main div.message-out span[data-icon='down-context']",
+        "#main div.message-out div[aria-label='Context menu']",
+    ],
+    "forward_menu_item": [
+        "li[data-animate-dropdown-item='true'] div[aria-label='Forward']",
+        "div[role='application'] li div[aria-label='Forward']",
+        "li[aria-label='Forward']",
+    ],
+    "forward_btn": [
+        "#main span[data-icon='forward']",
+        "button[aria-label='Forward']",
+        "div[role='button'][aria-label='Forward']",
+    ],
+    "forward_search_box": [
+        "div[data-animate-modal-popup='true'] div[contenteditable='true']",
+        "div[role='dialog'] div[contenteditable='true']",
+    ],
+    "forward_search_result": [
+        "div[data-animate-modal-popup='true'] div[role='listitem']:has(div[role='checkbox'][aria-checked='false'])",
+        "div[role='dialog'] div[role='listitem']:has(input[type='checkbox']:not(:checked))",
+    ],
+    "forward_send_btn": [
+        "div[data-animate-modal-popup='true'] span[data-icon='send']",
+        "div[role='dialog'] div[role='button'][aria-label='Send']",
+    ],
+    # Send confirmation (see util.wait_for_msg_sent). These are counted and searched within rather than waited for, so every candidate is used at once.
+    "outgoing_msg": [
+        "#main div.message-out",
+        "#main div[data-id^='true_']",
+    ],
+    "sent_tick": [
+        "span[data-icon='msg-check']",
+        "span[data-icon='msg-dblcheck']",
+        "span[data-icon='msg-dblcheck-ack']",
+        "span[aria-label=' Sent ']",
+        "span[aria-label=' Delivered ']",
+        "span[aria-label=' Read ']",
+    ],
+}
@@ -0,0 +1,50 @@
+"""Provides the Contact record that carries a contact's details through the program.
+
+Contact uses __slots__, so a record takes a fixed, small amount of memory (no per-instance __dict__) even for address books with tens of thousands of entries, and it precomputes what is looked up for every contact of a run: the normalized phone number used in the chat link and the month and day of the birthday used to index and filter contacts by date.
+"""
+
+import re
+
+_PHONE_NOISE = re.compile(r"[\s\-().]")
+
+
+def normalize_phone(number):
+    """Strip the spaces, dashes, dots and brackets people type in phone numbers, keeping a leading "+".
+
+    Args:
+        number (str): phone number as stored e.g., "+65 9123-4567".
+
+    Returns:
+        str: the normalized number e.g., "+6591234567".
+    """
+    return _PHONE_NOISE.sub("", str(number))
+
+
+class Contact:
+    """A contact's details: key, name, phone number, birthday and tag.
+    """
+
+    __slots__ = ("key", "name", "number", "phone", "bday", "bday_month", "bday_day", "tag")
+
+    def __init__(self, key: str, name: str, number: str, bday, tag: str, bday_month=None, bday_day=None):
+        """
+        Args:
+            key (str): the contact key e.g., "contact_00001".
+            name (str): the contact's name.
+            number (str): the phone number as stored.
+            bday (datetime.date): the date the next birthday message is due (see util.parse_bday).
+            tag (str): the contact's tag e.g., "work".
+            bday_month (int, optional): month of the stored birthday. Defaults to bday's month.
+            bday_day (int, optional): day of the stored birthday, which differs from bday's day for a 29 Feb birthday in a non-leap year. Defaults to bday's day.
+        """
+        self.key = key
+        self.name = name
+        self.number = number
+        self.phone = normalize_phone(number)
+        self.bday = bday
+        self.bday_month = bday_month or bday.month
+        self.bday_day = bday_day or bday.day
+        self.tag = tag
+
+    def __repr__(self):
+        return f"Contact({self.key!r}, {self.name!r}, {self.number!r}, {self.bday!r}, {self.tag!r})"
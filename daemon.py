@@ -0,0 +1,294 @@
+"""Runs the birthday, holiday and custom message campaigns unattended, on a schedule read from a job file.
+
+python daemon.py [--jobs PATH]
+    Stay running, wake up when the next job is due and run it. The browser is launched once and kept open between runs, and the contacts are loaded once per day instead of once per run.
+python daemon.py --run JOB_NAME [--jobs PATH]
+    Run one job of the job file now and exit, e.g., from a cron job or an Azure Function timer trigger.
+
+The job file (resources/jobs.json by default, see JOBS_PATH) looks like:
+{
+  "jobs": [
+    {"name": "bdays", "type": "bday", "source": "cloud", "at": "09:00"},
+    {"name": "holidays", "type": "holiday", "source": "local", "at": "09:05"},
+    {"name": "rent", "type": "custom", "source": "local", "at": "10:00", "days": [1], "msg": "Hi {first_name}, the rent is due today.", "tag": "family"}
+  ]
+}
+"type" is "bday", "holiday" or "custom" ("custom" jobs also need "msg" and either "tag", optionally with "broadcast": true, or the name of a "group" chat), "source" is "local" or "cloud" and "at" is the time of day (HH:MM). A job runs every day unless it is limited to some "weekdays" (0 is Monday) or "days" of the month.
+
+The time of the last run of every job is kept in DAEMON_STATE_PATH, so a run missed while the daemon was stopped is caught up when it starts again. A "bday" job catches up every day since its last run, so contacts whose birthday fell while the daemon was stopped get a late greeting; "holiday" and "custom" jobs only run once, for today. Catching up is safe as every campaign goes through the send queue, which never messages a contact twice.
+
+Note: Chrome has to be logged in to WhatsApp Web (scan the QR code once with python main.py) before the daemon can run headless (WPP_CHROME_MODE=performance).
+"""
+
+import argparse
+import datetime
+import json
+import os
+import time
+import util as u
+from const import JOBS_PATH, DAEMON_STATE_PATH, BDAY_TEMPLATE_BLOB, TAGS
+from metrics import metrics
+
+JOB_TYPES = ["bday", "holiday", "custom"]
+SOURCES = ["local", "cloud"]
+# Longest sleep between two checks of the schedule, so a changed system clock or a job file edit is noticed.
+MAX_SLEEP = 300
+
+
+class ScheduledJob:
+    """A campaign of the job file and when it runs.
+    """
+
+    def __init__(self, name: str, type: str, source: str, at: str, weekdays=None, days=None, msg=None, tag=None, broadcast=False, group=None):
+        """
+        Args:
+            name (str): unique name of the job.
+            type (str): "bday", "holiday" or "custom".
+            source (str): where the contacts are stored, "local" or "cloud".
+            at (str): time of day of the run in HH:MM format.
+            weekdays (list, optional): days of the week the job runs on, 0 is Monday. Defaults to every day.
+            days (list, optional): days of the month the job runs on. Defaults to every day.
+            msg (str, optional): message template of a "custom" job. Defaults to None.
+            tag (str, optional): tag of the recipients of a "custom" job, or "all". Defaults to None.
+            broadcast (bool, optional): forward the message of a "custom" job instead of visiting every chat (see util.run_broadcast). Defaults to False.
+            group (str, optional): name of a group chat a "custom" job posts its message to, instead of messaging contacts. Defaults to None.
+
+        Raises:
+            ValueError: if the job is not valid.
+        """
+        if type not in JOB_TYPES:
+            raise ValueError(f"Job {name}: type must be one of {JOB_TYPES}")
+        if source not in SOURCES:
+            raise ValueError(f"Job {name}: source must be one of {SOURCES}")
+        if type == "custom" and (not msg or (group is None and tag not in TAGS)):
+            raise ValueError(f"Job {name}: a custom job needs a msg and either a group or a tag in {TAGS}")
+        self.name = name
+        self.type = type
+        self.source = source
+        self.at = datetime.datetime.strptime(at, "%H:%M").time()
+        self.weekdays = set(weekdays) if weekdays else None
+        self.days = set(days) if days else None
+        self.msg = msg
+        self.tag = tag
+        self.broadcast = broadcast
+        self.group = group
+
+    def runs_on(self, date):
+        """Check if the job runs on a date.
+
+        Args:
+            date (datetime.date): the date.
+
+        Returns:
+            bool: True if the job runs on that date.
+        """
+        if self.weekdays is not None and date.weekday() not in self.weekdays:
+            return False
+        return self.days is None or date.day in self.days
+
+    def next_run(self, after):
+        """Return the first time the job is due strictly after a given time.
+
+        Args:
+            after (datetime.datetime): the time to start from.
+
+        Returns:
+            datetime.datetime: the next run, or None if its weekdays and days never coincide.
+        """
+        date = after.date()
+        for _ in range(366 * 4):
+            candidate = datetime.datetime.combine(date, self.at)
+            if candidate > after and self.runs_on(date):
+                return candidate
+            date += datetime.timedelta(days=1)
+        return None
+
+
+def load_jobs(path=JOBS_PATH):
+    """Read and validate the job file.
+
+    Args:
+        path (str, optional): path to the job file. Defaults to JOBS_PATH.
+
+    Returns:
+        list: the ScheduledJob objects.
+
+    Raises:
+        ValueError: if a job is not valid or two jobs have the same name.
+    """
+    with open(path, "r") as f:
+        jobs = [ScheduledJob(**job) for job in json.load(f)["jobs"]]
+    names = [job.name for job in jobs]
+    if len(names) != len(set(names)):
+        raise ValueError("Job names must be unique")
+    return jobs
+
+
+def load_state(path=DAEMON_STATE_PATH):
+    """Read the time of the last run of every job.
+
+    Args:
+        path (str, optional): path to the state file. Defaults to DAEMON_STATE_PATH.
+
+    Returns:
+        dict: datetimes of the last runs keyed by job name.
+    """
+    try:
+        with open(path, "r") as f:
+            return {name: datetime.datetime.fromisoformat(last_run) for name, last_run in json.load(f).items()}
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_state(state: dict, path=DAEMON_STATE_PATH):
+    """Write the time of the last run of every job, replacing the old state file atomically.
+
+    Args:
+        state (dict): datetimes of the last runs keyed by job name.
+        path (str, optional): path to the state file. Defaults to DAEMON_STATE_PATH.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({name: last_run.isoformat() for name, last_run in state.items()}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def missed_dates(last_run, today=None):
+    """Return the dates from the day after a job's last run up to today, i.e. the days a run has to cover.
+
+    Args:
+        last_run (datetime.datetime): the previous run of the job, or None.
+        today (datetime.date, optional): the date of this run. Defaults to today.
+
+    Returns:
+        list: the dates, oldest first; only today if the job never ran or already ran today.
+    """
+    today = today or datetime.date.today()
+    if last_run is None or last_run.date() >= today:
+        return [today]
+    days = (today - last_run.date()).days
+    return [last_run.date() + datetime.timedelta(days=i) for i in range(1, days + 1)]
+
+
+class Daemon:
+    """Runs scheduled jobs with one warm browser session and contact lists cached for the day.
+    """
+
+    def __init__(self, jobs: list, session):
+        """
+        Args:
+            jobs (list): the ScheduledJob objects.
+            session (WhatsAppSession): the browser session shared by every run.
+        """
+        self.jobs = jobs
+        self.session = session
+        self.contacts = {}
+
+    def get_contacts(self, source: str):
+        """Return the contacts of a source, loading them only once per day.
+
+        Birthday years are incremented in the storage after each greeting, so the list is reloaded when the date changes.
+
+        Args:
+            source (str): "local" or "cloud".
+
+        Returns:
+            list: the Contact records.
+        """
+        today = datetime.date.today()
+        loaded_on, contacts = self.contacts.get(source, (None, None))
+        if loaded_on != today or contacts is None:
+            contacts = u.generate_users_from_local() if source == "local" else u.generate_users_from_mongodb()
+            self.contacts[source] = (today, contacts)
+        return contacts
+
+    def run_job(self, job: ScheduledJob, last_run=None):
+        """Run a job's campaign and export the metrics of the run.
+
+        Args:
+            job (ScheduledJob): the job to run.
+            last_run (datetime.datetime, optional): the previous run of the job. A "bday" job also greets the celebrants of the days after it, which no run covered. Defaults to None (today only).
+        """
+        print(f"\n[{datetime.datetime.now():%Y-%m-%d %H:%M}] Running job {job.name}")
+        metrics.reset()
+        u.forget_templates()
+        try:
+            if job.type == "bday":
+                msg = u.load_template(BDAY_TEMPLATE_BLOB)
+                u.get_image_from_blob()
+                dates = missed_dates(last_run)
+                if job.source == "local":
+                    u.send_bday_msgs_from_local(self.get_contacts("local"), msg=msg, session=self.session, dates=dates)
+                else:
+                    # Only the celebrants of these dates are queried from the database.
+                    u.send_bday_msgs_from_cloud(None, msg=msg, session=self.session, dates=dates)
+                # The cached list has the old birthday years.
+                self.contacts.pop(job.source, None)
+            elif job.type == "holiday":
+                # The contacts are only loaded on a holiday.
+                if u.holidays_today():
+                    u.send_holiday_msgs(self.get_contacts(job.source), session=self.session)
+                else:
+                    print("No holiday today!")
+            else:
+                contacts = [] if job.group else self.get_contacts(job.source)
+                u.send_custom_msg(contacts, session=self.session, msg=job.msg, tag_filter=job.tag, broadcast=job.broadcast, group=job.group)
+        finally:
+            metrics.export()
+
+    def run_forever(self):
+        """Sleep until the next job is due and run it, forever. A failing run is reported and does not stop the daemon.
+        """
+        state = load_state()
+        now = datetime.datetime.now()
+        # A job that never ran is scheduled from now; a run missed while the daemon was stopped is due right away.
+        schedule = {job.name: job.next_run(state.get(job.name, now)) for job in self.jobs}
+        while True:
+            due = [(schedule[job.name], job) for job in self.jobs if schedule[job.name] is not None]
+            if not due:
+                print("No job is scheduled to run.")
+                return
+            run_at, job = min(due, key=lambda item: item[0])
+            wait = (run_at - datetime.datetime.now()).total_seconds()
+            if wait > 0:
+                time.sleep(min(wait, MAX_SLEEP))
+                continue
+            try:
+                self.run_job(job, last_run=state.get(job.name))
+            except Exception as e:
+                print(f"Job {job.name} failed: {e}")
+            now = datetime.datetime.now()
+            state[job.name] = now
+            save_state(state)
+            schedule[job.name] = job.next_run(now)
+
+
+def main():
+    """Daemon entry point.
+    """
+    parser = argparse.ArgumentParser(description="Run the message campaigns of a job file on schedule.")
+    parser.add_argument("--jobs", default=JOBS_PATH, help="path to the job file")
+    parser.add_argument("--run", metavar="JOB_NAME", help="run this job now and exit")
+    args = parser.parse_args()
+
+    jobs = load_jobs(args.jobs)
+    session = u.WhatsAppSession()
+    try:
+        daemon = Daemon(jobs, session)
+        if args.run:
+            job = next((job for job in jobs if job.name == args.run), None)
+            if job is None:
+                print(f"No job named {args.run} in {args.jobs}")
+                return
+            daemon.run_job(job)
+        else:
+            daemon.run_forever()
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        session.quit()
+        u.close_clients()
+
+
+if __name__ == "__main__":
+    main()
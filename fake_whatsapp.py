@@ -0,0 +1,162 @@
+"""Provides offline stand-ins of the external services, used by benchmark.py to measure the send pipeline without a phone, a WhatsApp account or Azure.
+
+FakeWhatsAppServer serves a local page that mimics the parts of WhatsApp Web the automation touches: the "send?phone=" chat link, the composer and its send button, the "+" menu with its file inputs, the upload preview with a caption box and the outgoing message bubbles going from pending (clock icon) to sent (tick icon). Its elements match the attribute-based fallbacks of the selector registry (SELECTORS in const.py), and every step of the page waits a configurable latency to imitate WhatsApp Web's network round trips. A number that is not a plausible international number shows WhatsApp's "invalid number" popup.
+
+FakeBlobServiceClient is an in-memory stand-in of the Azure BlobServiceClient, supporting the conditional downloads of BlobCache. For MongoDB, the benchmark uses mongomock when it is installed.
+"""
+
+import hashlib
+import threading
+import datetime
+from types import SimpleNamespace
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+FAKE_PAGE = """<!doctype html>
+<html>
+<head><meta charset="utf-8"><title>WhatsApp (fake)</title></head>
+<body>
+<div id="app">
+  <div id="main"><div id="chat"></div><footer></footer></div>
+  <div id="overlay"></div>
+</div>
+<script>
+const LATENCY = __LATENCY__ * 1000;
+const params = new URLSearchParams(location.search);
+const phone = (params.get("phone") || "").trim();
+const text = params.get("text") || "";
+const chat = document.getElementById("chat");
+const footer = document.querySelector("#main footer");
+const overlay = document.getElementById("overlay");
+
+function later(fn) { setTimeout(fn, LATENCY); }
+
+function addBubble() {
+  const bubble = document.createElement("div");
+  bubble.className = "message-out";
+  bubble.innerHTML = "<span data-icon='msg-time'></span>";
+  chat.appendChild(bubble);
+  later(() => { bubble.innerHTML = "<span data-icon='msg-check'></span>"; });
+}
+
+function showPreview() {
+  overlay.innerHTML = "<div contenteditable='true' aria-label='Add a caption'></div>" +
+                      "<div role='button' aria-label='Send'>send</div>";
+  overlay.querySelector("div[role='button']").onclick = () => { overlay.innerHTML = ""; addBubble(); };
+}
+
+later(() => {
+  if (!/^\\+?[1-9][0-9]{6,14}$/.test(phone.replace(/[ -]/g, ""))) {
+    overlay.innerHTML = "<div data-animate-modal-popup='true'>Phone number shared via url is invalid.</div>";
+    return;
+  }
+  footer.innerHTML =
+    "<div title='Attach' role='button'>+</div>" +
+    "<ul id='menu' style='display:none'>" +
+    "<li aria-label='Document'><div>Document<input type='file' accept='*' style='display:none'></div></li>" +
+    "<li aria-label='Photos &amp; videos'><div>Photos &amp; videos<input type='file' accept='image/*,video/mp4,video/3gpp,video/quicktime' style='display:none'></div></li>" +
+    "</ul>" +
+    "<div id='composer' contenteditable='true'></div>" +
+    "<button aria-label='Send'>&gt;</button>";
+  const composer = document.getElementById("composer");
+  const menu = document.getElementById("menu");
+  composer.textContent = text;
+  footer.querySelector("div[title='Attach']").onclick = () => { menu.style.display = "block"; };
+  footer.querySelector("button[aria-label='Send']").onclick = () => {
+    if (composer.textContent) { composer.textContent = ""; addBubble(); }
+  };
+  for (const input of footer.querySelectorAll("input[type='file']")) {
+    input.onchange = () => { menu.style.display = "none"; later(showPreview); };
+  }
+});
+</script>
+</body>
+</html>
+"""
+
+
+class FakeWhatsAppServer:
+    """Local HTTP server of the fake WhatsApp Web page, running in a background thread.
+
+    Can be used as a context manager:
+    ```
+    with FakeWhatsAppServer(latency=0.2) as server:
+        session = WhatsAppSession(base_url=server.url)
+    ```
+    """
+
+    def __init__(self, latency=0.2, port=0):
+        """
+        Args:
+            latency (float, optional): seconds every step of the page (chat load, upload preview, sent tick) takes. Defaults to 0.2.
+            port (int, optional): port to listen on; 0 picks a free one. Defaults to 0.
+        """
+        page = FAKE_PAGE.replace("__LATENCY__", str(float(latency))).encode()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class FakeBlobClient:
+    """In-memory stand-in of an Azure BlobClient.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.etag = '"' + hashlib.sha256(content).hexdigest()[:16] + '"'
+
+    def download_blob(self, etag=None, match_condition=None):
+        """Return a downloader of the blob, or raise ResourceNotModifiedError when the caller's ETag is still current (If-None-Match).
+        """
+        from azure.core.exceptions import ResourceNotModifiedError
+        if etag is not None and etag == self.etag:
+            raise ResourceNotModifiedError("The condition specified using HTTP conditional header(s) is not met.")
+        properties = SimpleNamespace(etag=self.etag, last_modified=datetime.datetime.now(datetime.timezone.utc))
+        return SimpleNamespace(readall=lambda: self.content, properties=properties)
+
+
+class FakeBlobServiceClient:
+    """In-memory stand-in of an Azure BlobServiceClient holding a fixed set of blobs.
+    """
+
+    def __init__(self, blobs: dict):
+        """
+        Args:
+            blobs (dict): blob contents (bytes) keyed by (container name, blob name).
+        """
+        self.blobs = blobs
+
+    def get_blob_client(self, container: str, blob: str):
+        return FakeBlobClient(self.blobs[(container, blob)])
+
+    def close(self):
+        pass
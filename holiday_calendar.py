@@ -0,0 +1,164 @@
+"""Provides the holiday calendar that decides which holiday greetings go out on a given day, and to whom.
+
+A holiday has a date rule: a fixed date (Christmas), a rule such as "the 2nd Sunday of May" (see nth_weekday) or a lunisolar date looked up in a table of Gregorian dates (Chinese New Year). Any callable taking a year and returning a date (or None) can be used as a rule, so a holiday is added by appending a Holiday to HOLIDAYS, e.g.,
+```
+HOLIDAYS.append(Holiday("mothers_day", "Mother's Day", nth_weekday(5, 6, 2), "holiday_mothers_day.txt",
+                        "Happy Mother's Day {name}!", tags=["family"]))
+```
+Each holiday can be limited to a set of contact tags. The dates of every holiday are computed once per year into a table keyed by (month, day), so a daily run finds today's greetings with a single lookup before any contact is loaded or any browser is launched.
+"""
+
+import datetime
+import threading
+
+# Chinese New Year (1st day of the 1st lunar month) in the Gregorian calendar.
+CHINESE_NEW_YEAR = {
+    2024: (2, 10), 2025: (1, 29), 2026: (2, 17), 2027: (2, 6), 2028: (1, 26),
+    2029: (2, 13), 2030: (2, 3), 2031: (1, 23), 2032: (2, 11), 2033: (1, 31),
+    2034: (2, 19), 2035: (2, 8), 2036: (1, 28), 2037: (2, 15), 2038: (2, 4),
+    2039: (1, 24), 2040: (2, 12),
+}
+
+
+def fixed(month: int, day: int):
+    """Date rule of a holiday on the same date every year.
+
+    Args:
+        month (int): month of the holiday.
+        day (int): day of the holiday.
+
+    Returns:
+        callable: the rule, returning the holiday's date in a given year.
+    """
+    return lambda year: datetime.date(year, month, day)
+
+
+def nth_weekday(month: int, weekday: int, n: int):
+    """Date rule of a holiday on the n-th given weekday of a month, e.g., the 2nd Sunday of May.
+
+    Args:
+        month (int): month of the holiday.
+        weekday (int): day of the week, 0 is Monday.
+        n (int): 1 for the first such weekday of the month, 2 for the second and so on, -1 for the last.
+
+    Returns:
+        callable: the rule, returning the holiday's date in a given year.
+    """
+    def rule(year):
+        if n > 0:
+            first = datetime.date(year, month, 1)
+            return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+        next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+        last = next_month - datetime.timedelta(days=1)
+        return last - datetime.timedelta(days=(last.weekday() - weekday) % 7 + 7 * (-n - 1))
+    return rule
+
+
+def lunisolar(table: dict, name: str):
+    """Date rule of a holiday following a lunisolar calendar, looked up in a table of Gregorian dates.
+
+    Args:
+        table (dict): (month, day) of the holiday keyed by year.
+        name (str): name of the holiday, used in the warning for a year missing from the table.
+
+    Returns:
+        callable: the rule, returning the holiday's date in a given year, or None if the year is not in the table.
+    """
+    def rule(year):
+        if year not in table:
+            print(f"The date of {name} in {year} is unknown, add it to the holiday calendar.")
+            return None
+        return datetime.date(year, *table[year])
+    return rule
+
+
+class Holiday:
+    """A holiday, its date rule, its greeting template and the tags of the contacts who get the greeting.
+    """
+
+    def __init__(self, key: str, name: str, rule, template_blob: str, default_template: str, tags=None):
+        """
+        Args:
+            key (str): id of the holiday e.g., "xmas", used in the campaign id of its greetings.
+            name (str): name of the holiday.
+            rule (callable): returns the date of the holiday in a given year, or None if there is none that year.
+            template_blob (str): name of the greeting template in the Blob "text" container.
+            default_template (str): greeting template used when the blob cannot be downloaded.
+            tags (list, optional): tags of the contacts who get the greeting. Defaults to every contact.
+        """
+        self.key = key
+        self.name = name
+        self.rule = rule
+        self.template_blob = template_blob
+        self.default_template = default_template
+        self.tags = set(tags) if tags else None
+
+    def recipients(self, contacts):
+        """Select the contacts who get this holiday's greeting.
+
+        Args:
+            contacts (iterable): the Contact records.
+
+        Returns:
+            list: the recipients.
+        """
+        return [contact for contact in contacts if self.tags is None or contact.tag in self.tags]
+
+
+HOLIDAYS = [
+    Holiday("xmas", "Christmas", fixed(12, 25), "holiday_xmas.txt",
+            "Merry Xmas {name}! May your holidays be filled with joy and laughter."),
+    Holiday("new_year", "New Year", fixed(1, 1), "holiday_new_year.txt",
+            "Happy New Year {name}! May your holidays be filled with joy and laughter. Wishing you a happy and prosperous New Year filled with joy and new beginnings!"),
+    Holiday("cny", "Chinese New Year", lunisolar(CHINESE_NEW_YEAR, "Chinese New Year"), "holiday_cny.txt",
+            "Happy Chinese New Year {name}! Wishing you good health, happiness and prosperity in the new year!",
+            tags=["family", "friend"]),
+]
+
+
+class HolidayCalendar:
+    """Holidays indexed by date, with the table of each year computed once.
+    """
+
+    def __init__(self, holidays: list):
+        """
+        Args:
+            holidays (list): the Holiday objects.
+        """
+        self.holidays = holidays
+        self.tables = {}
+        self.lock = threading.Lock()
+
+    def table(self, year: int):
+        """Return the holidays of a year keyed by (month, day), computing the table on first use.
+
+        Args:
+            year (int): the year.
+
+        Returns:
+            dict: lists of Holiday objects keyed by (month, day).
+        """
+        with self.lock:
+            if year not in self.tables:
+                table = {}
+                for holiday in self.holidays:
+                    date = holiday.rule(year)
+                    if date is not None:
+                        table.setdefault((date.month, date.day), []).append(holiday)
+                self.tables[year] = table
+            return self.tables[year]
+
+    def holidays_on(self, date):
+        """Return the holidays falling on a date.
+
+        Args:
+            date (datetime.date): the date.
+
+        Returns:
+            list: the Holiday objects, empty if there is no holiday that day.
+        """
+        return self.table(date.year).get((date.month, date.day), [])
+
+
+# Calendar of the built-in holidays, shared by every run of the process.
+default_calendar = HolidayCalendar(HOLIDAYS)
@@ -1,12 +1,33 @@
 import util as u
-from const import TEMP_PATH, MSG_KEY_NAME
+from const import MSG_KEY_NAME, BDAY_TEMPLATE_BLOB, BDAY_PHOTOS_BY_TAG
+from holiday_calendar import HOLIDAYS
+from concurrent.futures import ThreadPoolExecutor
+from metrics import metrics
 import os
 
 def main(): 
     """Program entry point.
+
+    Nothing is downloaded and no browser is launched until an operation that needs it is chosen. The browser and the Azure clients are closed even if the program stops with an error.
+    """
+    # One browser for the whole program run: Chrome is only launched once a campaign has recipients to message.
+    session = u.WhatsAppSession()
+    try:
+        run_menu(session)
+    finally:
+        session.quit()
+        u.close_clients()
+        metrics.export()
+        delete_all_temp()
+
+
+def run_menu(session):
+    """Ask the user what to send and to whom until they quit.
+
+    Args:
+        session (WhatsAppSession): the browser session of the program run.
     """
-    u.get_image_from_blob()
-    msg = u.get_text_from_blob()
+    msg = None
     # msg = get_msg()
     while True:
         local_or_db = input("Do you want to work with offline storage or Azure CosmosDB?\n1 for offline, 2 for Azure, q to quit\n>> ")
@@ -24,41 +45,61 @@ def main():
                 try:
                     user_op_int = int(user_op_str)
                     if user_op_int == 1:
-                        u.send_bday_msgs_from_local(user_list, msg=msg)
+                        msg = msg or prepare_bday_run()
+                        u.send_bday_msgs_from_local(user_list, msg=msg, session=session)
                     elif user_op_int == 2:
-                        u.send_holiday_msgs(user_list)
+                        u.send_holiday_msgs(user_list, session=session)
                     elif user_op_int == 3:
-                        u.send_custom_msg(user_list)
+                        u.send_custom_msg(user_list, session=session)
                 except Exception as e:
                     print(f"Enter a valid option! {e}")
                     continue
             
             # TODO after demo: validate inputs
             if local_or_db == "2":
-                user_list = u.generate_users_from_mongodb()  
                 user_op_str = input("1 for bday\n2 for holiday\n3 for custom msg\nq to go back\n> ")
                 if user_op_str == "q":
                     break
                 user_op_int = int(user_op_str)
                 if user_op_int == 1:
-                    u.send_bday_msgs_from_cloud(user_list, msg=msg)
+                    msg = msg or prepare_bday_run()
+                    # Only today's celebrants are queried from the database.
+                    u.send_bday_msgs_from_cloud(None, msg=msg, session=session)
                 elif user_op_int == 2:
-                    u.send_holiday_msgs(user_list)
+                    # The contacts are only downloaded on a holiday.
+                    if u.holidays_today():
+                        u.send_holiday_msgs(u.generate_users_from_mongodb(), session=session)
+                    else:
+                        print("No holiday today!")
                 elif user_op_int == 3:
-                    u.send_custom_msg(user_list)
-    
-    delete_all_temp()
+                    u.send_custom_msg(u.generate_users_from_mongodb(), session=session)
+
+
+def prepare_bday_run():
+    """Download the birthday message template and image from Azure Blob Storage at the same time.
+
+    Chrome is not launched here: the campaign launches it once the celebrants have been planned (see util.run_campaign), so a day without birthdays or a dry run never opens a browser.
+
+    Returns:
+        MessageTemplate: The compiled birthday message.
+    """
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        image = pool.submit(u.get_image_from_blob)
+        msg = pool.submit(u.load_template, BDAY_TEMPLATE_BLOB)
+        image.result()
+        return msg.result()
 
              
 def delete_all_temp():
-    """Delete all temporary files created e.g., text, images, JSON files.
+    """Delete all temporary files created e.g., text, images.
     
     Alternative method: use the temp folder to work with temp files.
     """
-    if os.path.exists(TEMP_PATH):
-        os.unlink(TEMP_PATH)
-    os.unlink(path="resources/bday_memeDOWNLOAD.jpg")
-    os.unlink(path="resources/msgDOWNLOAD.txt")
+    templates = [os.path.join("resources", holiday.template_blob.replace(".txt", "DOWNLOAD.txt")) for holiday in HOLIDAYS]
+    photos = [os.path.join("resources", f"bday_{tag}DOWNLOAD{os.path.splitext(blob_name)[1]}") for tag, blob_name in BDAY_PHOTOS_BY_TAG.items()]
+    for path in ["resources/bday_memeDOWNLOAD.jpg", "resources/msgDOWNLOAD.txt"] + templates + photos:
+        if path and os.path.exists(path):
+            os.unlink(path)
 
 
 def get_msg():
@@ -68,11 +109,7 @@ def get_msg():
         str: The message.
     """
     path_to_msg = "resources/msgDOWNLOAD.txt"
-    u.decrypt_json(path=path_to_msg, key_name=MSG_KEY_NAME)
-    with open(path_to_msg, "r") as f:
-        msg = f.read()
-    u.encrypt_json(path=path_to_msg, key_name=MSG_KEY_NAME)
-    return msg
+    return u.decrypt_to_bytes(path=path_to_msg, key_name=MSG_KEY_NAME).decode()
 
 
 def init_validation(user_input):
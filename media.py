@@ -0,0 +1,97 @@
+"""Provides the media stage that turns the photos downloaded from Azure Blob Storage into WhatsApp-friendly attachments before they are uploaded.
+
+WhatsApp re-encodes photos to at most about 1600 px on their long side anyway, so uploading a large original only makes the upload the slowest step of a send. A photo is scaled down to MEDIA_MAX_SIDE and saved as a JPEG of MEDIA_JPEG_QUALITY once, under the hash of its content in MEDIA_CACHE_DIR, and every later send (and every later run, as long as the photo does not change) reuses that file.
+
+Note: Pillow is optional. Without it, or for files that are not images (e.g., PDF documents), the original file is sent as is.
+"""
+
+import hashlib
+import os
+import threading
+from const import MEDIA_CACHE_DIR, MEDIA_MAX_SIDE, MEDIA_JPEG_QUALITY
+from metrics import timed
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
+
+# Prepared variants keyed by (path, modification time, size) of the original, so a file is only hashed once per run.
+_prepared = {}
+_prepared_lock = threading.Lock()
+
+
+def file_hash(path: str):
+    """Hash the content of a file.
+
+    Args:
+        path (str): path to the file.
+
+    Returns:
+        str: hex digest of the content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@timed("media_prepare")
+def prepare_image(path: str, max_side=MEDIA_MAX_SIDE, quality=MEDIA_JPEG_QUALITY, cache_dir=MEDIA_CACHE_DIR):
+    """Return the path of a resized and compressed variant of a photo, creating it only the first time the photo is seen.
+
+    Args:
+        path (str): path to the original photo.
+        max_side (int, optional): longest side of the variant in pixels. Defaults to MEDIA_MAX_SIDE.
+        quality (int, optional): JPEG quality of the variant. Defaults to MEDIA_JPEG_QUALITY.
+        cache_dir (str, optional): directory of the variants. Defaults to MEDIA_CACHE_DIR.
+
+    Returns:
+        str: path to the variant, or to the original if it cannot be (or does not need to be) made smaller.
+    """
+    if os.path.splitext(path)[1].lower() not in IMAGE_EXTENSIONS:
+        return path
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return path
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, max_side, quality)
+    with _prepared_lock:
+        if memo_key in _prepared:
+            return _prepared[memo_key]
+
+    variant = os.path.join(cache_dir, f"{file_hash(path)[:32]}_{max_side}_q{quality}.jpg")
+    if not os.path.exists(variant):
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with Image.open(path) as image:
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((max_side, max_side))
+                if image.mode != "RGB":
+                    image = image.convert("RGB")
+                tmp_path = variant + ".tmp"
+                image.save(tmp_path, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(tmp_path, variant)
+        except OSError as e:
+            print(f"Could not prepare {path}, sending the original: {e}")
+            return path
+    # Keep the original if re-encoding did not make it smaller.
+    result = variant if os.path.getsize(variant) < stat.st_size else path
+    with _prepared_lock:
+        _prepared[memo_key] = result
+    return result
+
+
+def select_attachment(user, attachments: dict):
+    """Pick the attachment of a recipient by their tag.
+
+    Args:
+        user (Contact): the recipient.
+        attachments (dict): paths to attachments keyed by tag, with the default one under None.
+
+    Returns:
+        str: path to the recipient's attachment, or None if there is none.
+    """
+    return attachments.get(user.tag, attachments.get(None))
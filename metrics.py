@@ -0,0 +1,155 @@
+"""Provides timing instrumentation of the send pipeline and exports run metrics.
+
+Steps are timed with the timed decorator or the Metrics.timer context manager, e.g., Chrome launch, opening a chat, waiting for a button, uploading a photo, Blob downloads and MongoDB calls. At the end of a run the per-step histograms (count, p50, p95, max) and counters are written to a JSON file or, if the file name ends with ".prom", to a Prometheus text file, so regressions show up when WhatsApp Web changes its UI.
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from const import METRICS_PATH
+
+
+def percentile(values: list, q: float):
+    """Return the q-th percentile of a list of values (nearest-rank method).
+
+    Args:
+        values (list): the values, not necessarily sorted.
+        q (float): percentile between 0 and 100.
+
+    Returns:
+        float: the percentile, or 0.0 for an empty list.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Metrics:
+    """Thread-safe store of step timings and counters of a run.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.counters = {}
+
+    def observe(self, name: str, seconds: float):
+        """Record how long a step took.
+
+        Args:
+            name (str): name of the step e.g., "open_chat".
+            seconds (float): duration of the step.
+        """
+        with self.lock:
+            self.timings.setdefault(name, []).append(seconds)
+
+    def inc(self, name: str, amount=1):
+        """Increase a counter.
+
+        Args:
+            name (str): name of the counter e.g., "msgs_sent".
+            amount (int, optional): increment. Defaults to 1.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str):
+        """Time the body of a with block as a step. A step that raises is also counted in the "<name>_errors" counter.
+
+        Args:
+            name (str): name of the step.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors")
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def summary(self):
+        """Summarize the timings of every step.
+
+        Returns:
+            dict: count, sum, p50, p95 and max (seconds) keyed by step name.
+        """
+        with self.lock:
+            timings = {name: list(values) for name, values in self.timings.items()}
+        return {
+            name: {
+                "count": len(values),
+                "sum": sum(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values),
+            }
+            for name, values in timings.items()
+        }
+
+    def to_json(self):
+        with self.lock:
+            counters = dict(self.counters)
+        return json.dumps({"generated_at": time.time(), "steps": self.summary(), "counters": counters}, indent=2)
+
+    def to_prometheus(self):
+        """Render the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: the metrics text.
+        """
+        lines = ["# TYPE wpp_step_seconds summary"]
+        for name, stats in self.summary().items():
+            lines.append(f'wpp_step_seconds{{step="{name}",quantile="0.5"}} {stats["p50"]:.6f}')
+            lines.append(f'wpp_step_seconds{{step="{name}",quantile="0.95"}} {stats["p95"]:.6f}')
+            lines.append(f'wpp_step_seconds{{step="{name}",quantile="1"}} {stats["max"]:.6f}')
+            lines.append(f'wpp_step_seconds_sum{{step="{name}"}} {stats["sum"]:.6f}')
+            lines.append(f'wpp_step_seconds_count{{step="{name}"}} {stats["count"]}')
+        with self.lock:
+            counters = dict(self.counters)
+        for name, value in counters.items():
+            lines.append(f"# TYPE wpp_{name}_total counter")
+            lines.append(f"wpp_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=METRICS_PATH):
+        """Write the metrics of the run to a file, as Prometheus text if the path ends with ".prom", otherwise as JSON.
+
+        Args:
+            path (str, optional): path to the metrics file. Defaults to METRICS_PATH.
+        """
+        content = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w") as f:
+            f.write(content)
+
+    def reset(self):
+        """Forget every timing and counter, e.g., between two scheduled runs.
+        """
+        with self.lock:
+            self.timings = {}
+            self.counters = {}
+
+
+# Metrics of the current process, shared by every instrumented function.
+metrics = Metrics()
+
+
+def timed(name: str):
+    """Decorator timing every call of a function as a step of the shared metrics.
+
+    Args:
+        name (str): name of the step.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,18 @@
+"""One-shot migration of the contacts stored in Azure Cosmos DB for MongoDB from a single document holding every contact to one document per contact.
+
+Run it once with python migrate.py, then set the AZURE_MONGODB_STORAGE_MODE env variable to "per_contact".
+"""
+
+import util as u
+from const import CONTACT_COLLECTION
+
+
+def main():
+    """Migrate the contacts and report how many were copied.
+    """
+    count = u.migrate_contacts_to_per_document()
+    print(f"Migrated {count} contacts to the '{CONTACT_COLLECTION}' collection.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Provides the planning stage that checks the recipients of a campaign before any browser is launched.
+
+Phone numbers are normalized to E.164 ("+" and up to 15 digits): numbers without "+" are taken as international numbers, as in WhatsApp links, and national numbers starting with a single 0 get DEFAULT_COUNTRY_CODE if it is set. A recipient is dropped from the plan if their number cannot be normalized or WhatsApp reported it as not registered in the last UNREGISTERED_TTL_DAYS days, and a recipient is skipped if another contact key already gets the same message on the same number. Tags that are not in TAGS are reported as warnings only, so a typo in a tag does not cost anyone their birthday greeting.
+
+The plan also estimates how long the campaign will take from the step timings of the current or last run (see metrics.py).
+
+python planner.py [--source local|cloud] [--tag TAG] [--workers N]
+    Print the plan of a message to the contacts with a tag, without sending anything. Set WPP_DRY_RUN=1 to only print the plans of the campaigns started from main.py or daemon.py.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+import threading
+from const import TAGS, DEFAULT_COUNTRY_CODE, UNREGISTERED_PATH, UNREGISTERED_TTL_DAYS, METRICS_PATH, SENDS_PER_MINUTE
+from contact import normalize_phone
+from metrics import metrics
+
+# Used for the estimate when no send has been timed yet.
+DEFAULT_SECONDS_PER_MSG = 10.0
+_E164 = re.compile(r"^\+[1-9][0-9]{6,14}$")
+
+
+def to_e164(number, default_country_code=DEFAULT_COUNTRY_CODE):
+    """Normalize a phone number to E.164.
+
+    Args:
+        number (str): phone number as stored e.g., "+61 400 000 000", "0061400000000" or "0400 000 000".
+        default_country_code (str, optional): country code of national numbers starting with 0. Defaults to DEFAULT_COUNTRY_CODE.
+
+    Returns:
+        str: the number in E.164 format e.g., "+61400000000", or None if it is not a valid number.
+    """
+    number = normalize_phone(number)
+    if number.startswith("00"):
+        number = "+" + number[2:]
+    elif number.startswith("0") and default_country_code:
+        number = f"+{default_country_code.lstrip('+')}{number[1:]}"
+    elif not number.startswith(("+", "0")):
+        # WhatsApp links take international numbers without the "+".
+        number = "+" + number
+    return number if _E164.match(number) else None
+
+
+class UnregisteredNumbers:
+    """Numbers WhatsApp reported as not registered, with the time of the report, kept in a JSON file across runs.
+    """
+
+    def __init__(self, path=UNREGISTERED_PATH, ttl_days=UNREGISTERED_TTL_DAYS):
+        """
+        Args:
+            path (str, optional): path to the JSON file. Defaults to UNREGISTERED_PATH.
+            ttl_days (float, optional): days after which a number is tried again, as it may have joined WhatsApp since. Defaults to UNREGISTERED_TTL_DAYS.
+        """
+        self.path = path
+        self.ttl = datetime.timedelta(days=ttl_days)
+        self.lock = threading.Lock()
+        self.numbers = None
+
+    def load(self):
+        """Read the file on first use. Must be called with the lock held.
+        """
+        if self.numbers is None:
+            try:
+                with open(self.path, "r") as f:
+                    self.numbers = {number: datetime.datetime.fromisoformat(reported) for number, reported in json.load(f).items()}
+            except (OSError, json.JSONDecodeError):
+                self.numbers = {}
+
+    def add(self, number: str):
+        """Record that WhatsApp reported a number as not registered.
+
+        Args:
+            number (str): the phone number.
+        """
+        number = to_e164(number) or normalize_phone(number)
+        with self.lock:
+            self.load()
+            self.numbers[number] = datetime.datetime.now()
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({number: reported.isoformat() for number, reported in self.numbers.items()}, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def __contains__(self, number):
+        with self.lock:
+            self.load()
+            reported = self.numbers.get(number)
+        return reported is not None and datetime.datetime.now() - reported < self.ttl
+
+
+# Numbers reported as not registered, shared by every campaign of the process.
+unregistered_numbers = UnregisteredNumbers()
+
+
+def estimate_seconds(count: int, workers=1, metrics_path=METRICS_PATH):
+    """Estimate how long sending a number of messages takes, from the median time of a send in the current run or, failing that, the last exported run.
+
+    Args:
+        count (int): number of messages.
+        workers (int, optional): number of browsers sending at the same time. Defaults to 1.
+        metrics_path (str, optional): metrics file of the last run. Defaults to METRICS_PATH.
+
+    Returns:
+        float: the estimated duration in seconds.
+    """
+    steps = metrics.summary()
+    if "compose_msg" not in steps and metrics_path.endswith(".json"):
+        try:
+            with open(metrics_path, "r") as f:
+                steps = json.load(f)["steps"]
+        except (OSError, ValueError, KeyError):
+            steps = {}
+    per_msg = steps.get("compose_msg", {}).get("p50") or DEFAULT_SECONDS_PER_MSG
+    if workers <= 1:
+        return count * per_msg
+    if not SENDS_PER_MINUTE:
+        # No rate limit.
+        return count * per_msg / workers
+    # The workers share the global rate limit.
+    return count * max(per_msg / workers, 60 / SENDS_PER_MINUTE)
+
+
+class SendPlan:
+    """The recipients of a campaign that will be messaged, and why the others will not.
+    """
+
+    def __init__(self):
+        self.recipients = []
+        self.rejected = {}
+        self.duplicates = {}
+        self.warnings = []
+        self.estimated_seconds = 0.0
+
+    @property
+    def keys(self):
+        return {user.key for user in self.recipients}
+
+    def print_summary(self):
+        """Print the size of the plan, the dropped recipients and the estimated duration.
+        """
+        print(f"Plan: {len(self.recipients)} recipient(s), {len(self.rejected)} rejected, {len(self.duplicates)} duplicate(s), "
+              f"about {datetime.timedelta(seconds=round(self.estimated_seconds))} to send")
+        for key, reason in self.rejected.items():
+            print(f"\t{key} rejected: {reason}")
+        for key, kept in self.duplicates.items():
+            print(f"\t{key} skipped: same number and msg as {kept}")
+        for warning in self.warnings:
+            print(f"\t{warning}")
+
+
+def plan_sends(contacts, msgs=None, workers=1):
+    """Validate, normalize and deduplicate the recipients of a campaign.
+
+    The phone number of every planned recipient is replaced by its E.164 form, which the chat link then uses.
+
+    Args:
+        contacts (iterable): the Contact records.
+        msgs (dict, optional): the message of each recipient keyed by contact key; recipients are duplicates only if they get the same message on the same number. Defaults to None (every recipient gets the same message).
+        workers (int, optional): number of browsers sending at the same time, for the estimate. Defaults to 1.
+
+    Returns:
+        SendPlan: the plan.
+    """
+    plan = SendPlan()
+    seen = {}
+    for user in contacts:
+        number = to_e164(user.phone)
+        if number is None:
+            plan.rejected[user.key] = f"{user.number!r} is not a valid phone number"
+            continue
+        if number in unregistered_numbers:
+            plan.rejected[user.key] = f"{number} was reported as not registered on WhatsApp"
+            continue
+        identity = (number, msgs.get(user.key) if msgs else None)
+        if identity in seen:
+            plan.duplicates[user.key] = seen[identity]
+            continue
+        seen[identity] = user.key
+        if user.tag not in TAGS or user.tag == "all":
+            plan.warnings.append(f"{user.key} has the unknown tag {user.tag!r}, expected one of {[tag for tag in TAGS if tag != 'all']}")
+        user.phone = number
+        plan.recipients.append(user)
+    plan.estimated_seconds = estimate_seconds(len(plan.recipients), workers)
+    return plan
+
+
+def main():
+    """Print the plan of a message to the contacts with a tag.
+    """
+    import util as u
+    parser = argparse.ArgumentParser(description="Print the send plan of a campaign without sending anything.")
+    parser.add_argument("--source", choices=["local", "cloud"], default="local", help="where the contacts are stored")
+    parser.add_argument("--tag", default="all", choices=TAGS, help="tag of the recipients")
+    parser.add_argument("--workers", type=int, default=1, help="number of browsers sending at the same time")
+    args = parser.parse_args()
+    stream = u.stream_contacts_from_local if args.source == "local" else u.stream_contacts_from_mongodb
+    plan_sends(stream(tag=args.tag), workers=args.workers).print_summary()
+
+
+if __name__ == "__main__":
+    main()
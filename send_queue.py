@@ -0,0 +1,117 @@
+"""Provides a durable, on-disk queue of the messages of a send run (campaign), stored in SQLite.
+
+Every (contact key, message hash) pair of a campaign is recorded with its status and number of attempts before anything is sent. If a run is interrupted, running the same campaign again only sends what is not marked as sent yet, so contacts are neither messaged twice nor skipped.
+
+Note: a message that was being sent when the program died stays "in_progress" and is sent again on resume, as there is no way to know whether WhatsApp got it. A message whose send button was clicked but whose sent tick never showed is marked "unconfirmed" and is not sent again, as a missing message is better than a duplicate one.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from const import SEND_QUEUE_PATH
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "sent"
+FAILED = "failed"
+UNCONFIRMED = "unconfirmed"
+
+
+def message_hash(msg: str):
+    """Hash a message so the queue can tell different messages to the same contact apart without storing their text.
+
+    Args:
+        msg (str): the message.
+
+    Returns:
+        str: hex digest of the message.
+    """
+    return hashlib.sha256(msg.encode()).hexdigest()[:16]
+
+
+class SendQueue:
+    """SQLite-backed queue of (contact key, message hash, status, attempts) per campaign. Safe to use from several worker threads.
+    """
+
+    def __init__(self, path=SEND_QUEUE_PATH):
+        """
+        Args:
+            path (str, optional): path to the SQLite database. Defaults to SEND_QUEUE_PATH.
+        """
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    campaign TEXT NOT NULL,
+                    contact_key TEXT NOT NULL,
+                    msg_hash TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (campaign, contact_key, msg_hash)
+                )""")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def enqueue(self, campaign: str, items: list):
+        """Add jobs to a campaign. Jobs already in the campaign keep their status.
+
+        Args:
+            campaign (str): id of the campaign e.g., "custom:2024-05-14:<hash>".
+            items (list): (contact key, message hash) pairs.
+        """
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (campaign, contact_key, msg_hash, status, attempts, updated_at) VALUES (?, ?, ?, ?, 0, ?)",
+                [(campaign, key, msg_hash, PENDING, now) for key, msg_hash in items])
+
+    def has_campaign(self, campaign: str):
+        """Check if a campaign was already enqueued by an earlier run.
+
+        Args:
+            campaign (str): id of the campaign.
+
+        Returns:
+            bool: True if the campaign has jobs.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM jobs WHERE campaign = ? LIMIT 1", (campaign,)).fetchone()
+        return row is not None
+
+    def unsent(self, campaign: str):
+        """Return the jobs of a campaign that still have to be sent.
+
+        Args:
+            campaign (str): id of the campaign.
+
+        Returns:
+            dict: message hashes keyed by contact key.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT contact_key, msg_hash FROM jobs WHERE campaign = ? AND status NOT IN (?, ?)", (campaign, DONE, UNCONFIRMED)).fetchall()
+        return dict(rows)
+
+    def mark(self, campaign: str, key: str, msg_hash: str, status: str):
+        """Update the status of a job, counting an attempt when it is started.
+
+        Args:
+            campaign (str): id of the campaign.
+            key (str): contact key.
+            msg_hash (str): hash of the message.
+            status (str): PENDING, IN_PROGRESS, DONE, FAILED or UNCONFIRMED.
+        """
+        attempt = 1 if status == IN_PROGRESS else 0
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + ?, updated_at = ? WHERE campaign = ? AND contact_key = ? AND msg_hash = ?",
+                (status, attempt, time.time(), campaign, key, msg_hash))
+
+    def close(self):
+        self.conn.close()
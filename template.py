@@ -0,0 +1,98 @@
+"""Provides message templates with named placeholders, compiled once and rendered for every recipient of a run.
+
+A template is plain text with placeholders in braces, e.g., "Happy birthday {first_name}!". The legacy "zzzz" placeholder still stands for the contact's name. The text is split into literal parts and placeholder lookups when the template is created, so rendering a message is a single join per contact instead of a chain of str.replace calls, and a misspelt placeholder is reported before anything is sent.
+
+Note: the contact's age is not available as a placeholder, as the stored birthday year is the year the next message is due rather than the year of birth.
+"""
+
+import re
+
+LEGACY_NAME_PLACEHOLDER = "zzzz"
+# "{{" and "}}" are literal braces.
+_TOKEN = re.compile(r"\{\{|\}\}|\{(\w+)\}")
+
+# Values of the placeholders, read from a Contact.
+PLACEHOLDERS = {
+    "name": lambda contact: contact.name,
+    "first_name": lambda contact: contact.name.split()[0] if contact.name.strip() else contact.name,
+    "tag": lambda contact: contact.tag,
+}
+
+
+class MessageTemplate:
+    """A message compiled into literal parts and placeholder lookups.
+    """
+
+    def __init__(self, text: str):
+        """
+        Args:
+            text (str): the message with {name}, {first_name}, {tag} or legacy "zzzz" placeholders; "{{" and "}}" stand for literal braces.
+
+        Raises:
+            ValueError: if the message uses an unknown placeholder.
+        """
+        self.text = text
+        # Even indexes are literal text, odd indexes are placeholder lookups.
+        self.parts = [""]
+        unknown = set()
+        source = text.replace(LEGACY_NAME_PLACEHOLDER, "{name}")
+        position = 0
+        for match in _TOKEN.finditer(source):
+            self.parts[-1] += source[position:match.start()]
+            position = match.end()
+            name = match.group(1)
+            if name is None:
+                self.parts[-1] += match.group()[0]
+            elif name in PLACEHOLDERS:
+                self.parts += [PLACEHOLDERS[name], ""]
+            else:
+                unknown.add(name)
+        self.parts[-1] += source[position:]
+        if unknown:
+            raise ValueError(f"Unknown placeholder(s) {', '.join(sorted(unknown))}, use one of: {', '.join(PLACEHOLDERS)}")
+        self.is_static = len(self.parts) == 1
+
+    def __repr__(self):
+        return f"MessageTemplate({self.text!r})"
+
+    @property
+    def static_text(self):
+        """The message of a template without placeholders, None if it has placeholders.
+        """
+        return self.parts[0] if self.is_static else None
+
+    def render(self, contact):
+        """Fill in the placeholders for a contact.
+
+        Args:
+            contact (Contact): the recipient.
+
+        Returns:
+            str: the message for the contact.
+        """
+        if self.is_static:
+            return self.parts[0]
+        return "".join(part if i % 2 == 0 else part(contact) for i, part in enumerate(self.parts))
+
+    def render_all(self, contacts):
+        """Render the message for every recipient of a run in one pass.
+
+        Args:
+            contacts (iterable): the recipients.
+
+        Returns:
+            dict: the message of each recipient keyed by contact key.
+        """
+        return {contact.key: self.render(contact) for contact in contacts}
+
+
+def compile_template(msg):
+    """Return a message as a MessageTemplate, compiling it if it is still plain text.
+
+    Args:
+        msg (str or MessageTemplate): the message.
+
+    Returns:
+        MessageTemplate: the compiled message.
+    """
+    return msg if isinstance(msg, MessageTemplate) else MessageTemplate(msg)
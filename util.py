@@ -7,22 +7,96 @@ Provide functions that generate current date, customized message, contact list f
 Provides utility functions for Selenium automation on WhatsApp Web e.g., finding a button and click it.
 
 Note: the choice of using CSS selector rather than XPath to find elements is for better speed, browser support, readability and specificity.
+
+Note: selenium, pymongo, azure-storage and cryptography are imported inside the functions that use them, so importing this module (and starting the program) does not pay for libraries the chosen operation does not need.
 """
 
-from time import sleep
 from datetime import datetime as dt
 import json
 import datetime
-from const import CONTACT_PATH_LOCAL, DOCUMENT_ID, TEMP_PATH, TAGS, MSG_KEY_NAME, CONTACT_KEY_NAME,PATH_TO_RESOURCES
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bson import ObjectId
-from cryptography.fernet import Fernet
+import threading
+import shutil
+import random
+import time
+from urllib.parse import quote
+from const import CONTACT_PATH_LOCAL, DOCUMENT_ID, CONTACT_STORAGE_MODE, CONTACT_COLLECTION, MONGO_BATCH_SIZE, TAGS, MSG_KEY_NAME, CONTACT_KEY_NAME,PATH_TO_RESOURCES, PROFILE_PATH, CHROME_MODE, CHROME_USER_AGENT, WHATSAPP_WEB_URL, JOURNAL_PATH, MONGO_MAX_POOL_SIZE, BLOB_MAX_POOL_SIZE, AZURE_CONNECT_TIMEOUT, AZURE_READ_TIMEOUT, MAX_WORKERS, SENDS_PER_MINUTE, FORWARD_LIMIT, DRY_RUN, SEND_MAX_ATTEMPTS, SEND_RETRY_BASE_DELAY, STEP_TIMEOUTS, SELECTORS, SELECTOR_VERSION, SELECTORS_OVERRIDE_PATH, PHOTO_PATH, DOC_PATH, BDAY_PHOTOS_BY_TAG
 import os
-from azure.storage.blob import BlobServiceClient
-from pymongo import MongoClient
+from contact import Contact
+from holiday_calendar import default_calendar
+from media import prepare_image, select_attachment
+from metrics import metrics, timed
+from planner import plan_sends, unregistered_numbers
+from template import MessageTemplate, compile_template
+from send_queue import SendQueue, message_hash, IN_PROGRESS, DONE, FAILED as QUEUE_FAILED, UNCONFIRMED as QUEUE_UNCONFIRMED
+from worker_pool import run_in_pool, SendReport, SendError, SENT, FAILED, SKIPPED, INVALID_NUMBER, SELECTOR_TIMEOUT, UPLOAD_FAILED, BROWSER_CRASH, UI_ERROR, UNCONFIRMED, UNKNOWN_ERROR, TRANSIENT_FAILURES
+
+FERNET_HEADER = b"gAAAAA"
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_shared_client(name: str, factory):
+    """Return a process-wide client from the client registry, creating it on first use.
+
+    Each client owns a connection pool (and a TLS session) to Azure, so one client per service is created and reused by every function instead of a new one per call.
+
+    Args:
+        name (str): name of the client in the registry e.g., "mongo".
+        factory (callable): creates the client when it does not exist yet.
+
+    Returns:
+        The shared client.
+    """
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def close_clients():
+    """Close every shared client and its connections. The next call to get_shared_client creates new ones.
+    """
+    with _clients_lock:
+        for name, client in _clients.items():
+            try:
+                client.close()
+            except Exception as e:
+                print(f"An error has occurred when closing the {name} client: {e}")
+        _clients.clear()
+
+
+def create_blob_service_client():
+    """Create an Azure Blob Service Client with a bounded connection pool and timeouts.
+
+    Returns:
+        BlobServiceClient: the BlobServiceClient based on the Blob Connection String saved in local env variable
+    """
+    import requests
+    from azure.core.pipeline.transport import RequestsTransport
+    from azure.storage.blob import BlobServiceClient
+    http_session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=BLOB_MAX_POOL_SIZE, pool_maxsize=BLOB_MAX_POOL_SIZE)
+    http_session.mount("https://", adapter)
+    transport = RequestsTransport(session=http_session, session_owner=True,
+                                  connection_timeout=AZURE_CONNECT_TIMEOUT, read_timeout=AZURE_READ_TIMEOUT)
+    BLOB_CONN_STRING = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
+    return BlobServiceClient.from_connection_string(BLOB_CONN_STRING, transport=transport)
+
+
+def create_mongo_client():
+    """Create the MongoDB client of Azure Cosmos DB for MongoDB with a bounded connection pool and timeouts.
+
+    Returns:
+        MongoClient: the client based on the connection string saved in local env variable
+    """
+    from pymongo import MongoClient
+    variable = "AzureMongoDBConnectionStr"
+    CONNECTION_STRING = os.getenv(variable)
+    timeout_ms = int(AZURE_CONNECT_TIMEOUT * 1000)
+    return MongoClient(CONNECTION_STRING, maxPoolSize=MONGO_MAX_POOL_SIZE, connectTimeoutMS=timeout_ms,
+                       serverSelectionTimeoutMS=timeout_ms, socketTimeoutMS=int(AZURE_READ_TIMEOUT * 1000))
 
 
 def get_blob_service_client():
@@ -31,11 +105,10 @@ def get_blob_service_client():
     Alternative way to authenticate: use Microsoft Entra ID instead of connection strings
 
     Returns:
-        BlobServiceClient: the BlobServiceClient returned based on the Blob Connection String save in local env variable
+        BlobServiceClient: the shared BlobServiceClient based on the Blob Connection String save in local env variable
     """
     try:
-        BLOB_CONN_STRING = os.getenv('AZURE_STORAGE_CONNECTION_STRING')
-        return BlobServiceClient.from_connection_string(BLOB_CONN_STRING)
+        return get_shared_client("blob", create_blob_service_client)
     except Exception as e:
         print(f"An error has occurred: {e}")
 
@@ -59,6 +132,23 @@ def get_image_from_blob():
     return download_file_path
 
 
+def get_bday_photos():
+    """Return the birthday photo of every tag of BDAY_PHOTOS_BY_TAG, downloading them through the blob cache, along with the default birthday photo.
+
+    Returns:
+        dict: paths to the photos keyed by tag, with the default photo (PHOTO_PATH) under None.
+    """
+    photos = {None: PHOTO_PATH}
+    for tag, blob_name in BDAY_PHOTOS_BY_TAG.items():
+        download_file_path = os.path.join(PATH_TO_RESOURCES, f"bday_{tag}DOWNLOAD{os.path.splitext(blob_name)[1]}")
+        try:
+            download(blob_service_client=get_blob_service_client(), container_name="images", download_file_path=download_file_path, blob_name=blob_name)
+            photos[tag] = download_file_path
+        except Exception as e:
+            print(f"Could not download the birthday photo of {tag} contacts, using the default one: {e}")
+    return photos
+
+
 def get_text_from_blob():
     """Download birthday message from the "text" container from "demofunc0001" storage account
 
@@ -80,6 +170,51 @@ def get_text_from_blob():
         return msg
 
 
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def load_template(blob_name: str, default=None):
+    """Download a message template from the "text" container and compile it, once per program run.
+
+    The blob goes through the blob cache, so an unchanged template is not downloaded again on the next run either. A template encrypted with the message key is decrypted in memory.
+
+    Args:
+        blob_name (str): Name of the blob e.g., "msg.txt".
+        default (str, optional): template used when the blob cannot be downloaded. If None, the error is raised. Defaults to None.
+
+    Returns:
+        MessageTemplate: the compiled template.
+    """
+    with _templates_lock:
+        if blob_name in _templates:
+            return _templates[blob_name]
+    try:
+        download_file_path = os.path.join(PATH_TO_RESOURCES, str.replace(blob_name, '.txt', 'DOWNLOAD.txt'))
+        download(blob_service_client=get_blob_service_client(), container_name="text", download_file_path=download_file_path, blob_name=blob_name)
+        if is_encrypted(download_file_path):
+            text = decrypt_to_bytes(download_file_path, MSG_KEY_NAME).decode()
+        else:
+            with open(download_file_path, "r") as f:
+                text = f.read()
+    except Exception as e:
+        if default is None:
+            raise
+        print(f"Could not download the template {blob_name}, using the built-in one: {e}")
+        text = default
+    template = MessageTemplate(text)
+    with _templates_lock:
+        _templates[blob_name] = template
+    return template
+
+
+def forget_templates():
+    """Drop the compiled templates, so the next load_template call checks Azure for a newer version, e.g., before each scheduled run.
+    """
+    with _templates_lock:
+        _templates.clear()
+
+
 def get_doc_from_blob():
     """Download a document from the "docs" container from "demofunc0001" storage account
     
@@ -98,33 +233,136 @@ def get_doc_from_blob():
     return download_file_path
 
 
+@timed("blob_download")
 def download(blob_service_client, container_name: str, download_file_path: str, blob_name: str):
     """The actual process of downloading from Azure Blob
 
+    The blob goes through the local blob cache, so it is only downloaded if it is not cached yet or has changed in Azure. The cached file is then copied to download_file_path.
+
     Args:
         blob_service_client (_type_): The Blob service client.
         container_name (str): Name of the Blob container.
         download_file_path (str): Path to download.
         blob_name (str): Name of the blob.
     """
-    container_client = blob_service_client.get_container_client(container_name) 
-    print("\nDownloading blob to \n\t" + download_file_path)
-    
-    with open(file=download_file_path, mode="wb") as download_file:
-        download_file.write(container_client.download_blob(blob_name).readall())
+    cached_path = get_blob_cache().fetch(blob_service_client, container_name=container_name, blob_name=blob_name)
+    print("\nCopying blob to \n\t" + download_file_path)
+    shutil.copyfile(cached_path, download_file_path)
+
+
+_blob_cache = None
+_blob_cache_lock = threading.Lock()
+
 
+def get_blob_cache():
+    """Return the blob cache shared by all downloads, creating it on first use.
 
-def get_collection():
+    Returns:
+        BlobCache: the blob cache.
+    """
+    from blob_cache import BlobCache
+    global _blob_cache
+    # Downloads run in parallel threads, which must all share one cache index.
+    with _blob_cache_lock:
+        if _blob_cache is None:
+            _blob_cache = BlobCache()
+        return _blob_cache
+
+
+def get_collection(name=None):
     """To return a collection (of contacts) from the local MongoDB database
 
+    Args:
+        name (str, optional): name of the collection. Defaults to the AZURE_MONGODB_COLLECTION env variable.
+
     Returns:
         pymongo.collection.Collection: the collection of a MongoDB database.
     """
-    variable = "AzureMongoDBConnectionStr"
-    CONNECTION_STRING = os.getenv(variable)
-    client = MongoClient(CONNECTION_STRING)
+    client = get_shared_client("mongo", create_mongo_client)
     database = client[os.getenv("AZURE_MONGODB_DB")]
-    return database[os.getenv("AZURE_MONGODB_COLLECTION")]
+    return database[name or os.getenv("AZURE_MONGODB_COLLECTION")]
+
+
+def get_contact_collection():
+    """To return the collection where every contact is its own document ("per_contact" storage mode).
+
+    Returns:
+        pymongo.collection.Collection: the collection of contact documents.
+    """
+    return get_collection(CONTACT_COLLECTION)
+
+
+def ensure_contact_indexes(collection):
+    """Create the indexes used to query contact documents by birthday and by tag. Creating an index that already exists is a no-op.
+
+    Args:
+        collection (pymongo.collection.Collection): the collection of contact documents.
+    """
+    from pymongo import ASCENDING
+    collection.create_index([("bday_month", ASCENDING), ("bday_day", ASCENDING)])
+    collection.create_index([("tag", ASCENDING)])
+
+
+def contact_to_document(key: str, value: dict):
+    """Turn a contact of contacts.json (or of the single contacts document) into its own MongoDB document.
+
+    The birthday month and day are stored separately so birthday lookups can use an index.
+
+    Args:
+        key (str): the contact key e.g., "contact_00001", used as the document _id.
+        value (dict): the contact's name, number, bday and tag.
+
+    Returns:
+        dict: the contact document.
+    """
+    _, month, day = (int(part) for part in value["bday"].split("-"))
+    return {
+        "_id": key,
+        "name": value["name"],
+        "number": value["number"],
+        "bday": value["bday"],
+        "tag": value["tag"],
+        "bday_month": month,
+        "bday_day": day,
+    }
+
+
+def migrate_contacts_to_per_document():
+    """One-shot migration from the single contacts document to one document per contact.
+
+    Contacts are upserted by contact key, so running the migration again is safe. The original document is left untouched.
+
+    Returns:
+        int: number of contacts migrated.
+    """
+    from pymongo import ReplaceOne
+    data_raw_with_id = get_document_from_azure_mongodb()
+    if data_raw_with_id is None:
+        return 0
+    requests = [ReplaceOne({"_id": key}, contact_to_document(key, value), upsert=True)
+                for key, value in data_raw_with_id.items() if key != "_id"]
+    collection = get_contact_collection()
+    if requests:
+        collection.bulk_write(requests, ordered=False)
+    ensure_contact_indexes(collection)
+    return len(requests)
+
+
+def get_or_create_key(key_name: str):
+    """Read the Fernet key from a key file, generating and saving a new key only if the file does not exist yet.
+
+    Args:
+        key_name (str): The path to the key file.
+
+    Returns:
+        bytes: the Fernet key.
+    """
+    from cryptography.fernet import Fernet
+    if not os.path.exists(key_name):
+        with open(key_name, "wb") as f:
+            f.write(Fernet.generate_key())
+    with open(key_name, "rb") as f:
+        return f.read()
 
 
 def encrypt_json(path: str, key_name: str):
@@ -132,138 +370,518 @@ def encrypt_json(path: str, key_name: str):
 
     Args:
         path (str): The path to contacts.json
+        key_name (str): The path to the key file. The existing key is reused; a key is only generated if there is none.
     """
-    key = Fernet.generate_key()
-    with open(key_name, "wb") as f:
-        f.write(key)
-    with open(key_name, "rb") as f:
-        key = f.read()
-    fernet = Fernet(key)
     with open(path, "rb") as f:
         original = f.read()
-    encrypted = fernet.encrypt(original)
-    with open(path, "wb") as f:
-        f.write(encrypted)
+    encrypt_bytes_to_file(original, path, key_name)
 
 
 def decrypt_json(path: str, key_name: str):
     """To decrypt contacts.json stored in local directory
 
+    Note: this writes the plaintext back to disk. Use decrypt_to_bytes to read an encrypted file without that.
+
     Args:
         path (str): The path to contacts.json
     """
+    decrypted = decrypt_to_bytes(path, key_name)
+    with open(path, "wb") as f:
+        f.write(decrypted)
+
+
+def decrypt_to_bytes(path: str, key_name: str):
+    """Read an encrypted file and decrypt it in memory, leaving the file on disk encrypted.
+
+    Args:
+        path (str): The path to the encrypted file e.g., contacts.json.
+        key_name (str): The path to the key file.
+
+    Returns:
+        bytes: the decrypted content.
+    """
+    from cryptography.fernet import Fernet
     with open(key_name, "rb") as f:
         key = f.read()
-    fernet = Fernet(key)
     with open(path, "rb") as f:
         encrypted = f.read()
-    decrypted = fernet.decrypt(encrypted)
+    return Fernet(key).decrypt(encrypted)
+
+
+def encrypt_bytes_to_file(data: bytes, path: str, key_name: str):
+    """Encrypt content in memory and write it to a file, so the plaintext never touches the disk.
+
+    Args:
+        data (bytes): the content to encrypt.
+        path (str): The path to the file to write.
+        key_name (str): The path to the key file. The existing key is reused; a key is only generated if there is none.
+    """
+    from cryptography.fernet import Fernet
+    fernet = Fernet(get_or_create_key(key_name))
+    encrypted = fernet.encrypt(data)
     with open(path, "wb") as f:
-        f.write(decrypted)
+        f.write(encrypted)
         
 
-def is_encrypted(path, key_name: str):
+def is_encrypted(path, key_name=None):
     """Check if contacts.json is encrypted or not
 
+    Every Fernet token starts with the same version byte and timestamp prefix, which base64-encodes to "gAAAAA", so only the first bytes of the file are read.
+
     Args:
         path (str): The path to contacts.json
+        key_name (str, optional): Unused, kept for backwards compatibility.
 
     Returns:
         bool: returns True if encrypted, otherwise False
     """
     try:
-        decrypt_json(path, key_name)
-        encrypt_json(path, key_name)
-        return True
-    except Exception as e:
+        with open(path, "rb") as f:
+            return f.read(len(FERNET_HEADER)) == FERNET_HEADER
+    except OSError:
         return False
 
 
-def create_chromedriver_options():
+def create_chromedriver_options(profile=None, mode=CHROME_MODE):
     """Set up ChromeDriver options to avoid 2nd login to WhatsApp Web with QR code each time for session persistence along with some extra configuration.
     
     Below you can see the Chrome cmd-line option that specifies the dir where user data (like profiles, settings, etc.) is stored - useful when you want to reuse an existing Chrome user profile, enabling you to persist settings, cookies, and other user-specific data between browser sessions.
     
-    Note: "--headless=new" rather than just "--headlesss" for Chrome versions >= 109. Disable headless mode for demo purpose.
+    Note: "--headless=new" rather than just "--headlesss" for Chrome versions >= 109. The "default" mode is headed for demo purpose; the "performance" mode is meant for unattended runs: headless, a fixed small window, no images, extensions, GPU or background networking, and an "eager" page load strategy (the page is usable once the DOM is ready, without waiting for every resource). WhatsApp Web refuses the headless user agent, so a regular Chrome user agent is sent instead. Run python benchmark.py chrome to compare the launch time and memory of both modes.
+
+    Args:
+        profile (str, optional): The user-data-dir to use, e.g., a worker's own copy of the profile. Defaults to the main "profile/wpp" directory.
+        mode (str, optional): "default" or "performance". Defaults to CHROME_MODE.
 
     Returns:
         Options: The Configured ChromeDriver options.
     """
-    dir_path = os.getcwd()
-    profile = os.path.join(dir_path, "profile", "wpp")
+    from selenium import webdriver
+    if profile is None:
+        profile = os.path.join(os.getcwd(), PROFILE_PATH)
     ops = webdriver.ChromeOptions()
     ops.add_argument(f"user-data-dir={profile}")
-    ops.add_argument("--start-maximized")
-    # ops.add_argument('--headless=new')
     ops.add_experimental_option('excludeSwitches', ['enable-logging'])
     ops.add_argument("--log-level=3") 
-    # TODO: explore more option arguments to maximize speed and minimize resource usage.
+    if mode == "performance":
+        ops.add_argument("--headless=new")
+        ops.add_argument(f"--user-agent={CHROME_USER_AGENT}")
+        ops.add_argument("--window-size=1280,900")
+        ops.add_argument("--disable-gpu")
+        ops.add_argument("--disable-extensions")
+        ops.add_argument("--disable-background-networking")
+        ops.add_argument("--disable-default-apps")
+        ops.add_argument("--disable-sync")
+        ops.add_argument("--disable-dev-shm-usage")
+        ops.add_argument("--mute-audio")
+        ops.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        ops.page_load_strategy = "eager"
+    else:
+        ops.add_argument("--start-maximized")
     return ops
 
 
-def open_whatsapp_web(user: list, msg=""):
+@timed("open_whatsapp_web")
+def open_whatsapp_web(user: Contact, msg=""):
     """Create a ChromeDriver with options and open WhatsApp Web in Chrome.
     
-    Note: user[2] indicates user's mobile number.
+    Note: user.phone indicates user's mobile number.
 
     Args:
-        user (list): User's details.
+        user (Contact): User's details.
         msg (str, optional): text message to send to a contact. Defaults to "".
 
     Returns:
         WebDriver: A Chrome WebDriver object.
     """
+    from selenium import webdriver
     ops = create_chromedriver_options()
-    link = f"https://web.whatsapp.com/send?phone={user[2]}&text={msg}"
     driver = webdriver.Chrome(options=ops)
-    driver.get(link)
+    driver.get(build_chat_link(user=user, msg=msg))
     return driver
 
 
-def click_plus_btn_in_chat(driver):
-    """Find the "+" button next to the message text box by its CSS selector and click it.
+def build_chat_link(user: Contact, msg="", base_url=WHATSAPP_WEB_URL):
+    """Build the WhatsApp Web link that opens the chat of a contact with an optional pre-filled message.
+
+    The phone number and the message are URL-encoded, so characters such as "&", "#", "+" or line breaks in a message do not cut it short or break the link.
+
+    Args:
+        user (Contact): User's details.
+        msg (str, optional): text message to pre-fill in the chat. Defaults to "".
+        base_url (str, optional): base URL of WhatsApp Web. Defaults to WHATSAPP_WEB_URL.
+
+    Returns:
+        str: The "send?phone=" link to the contact's chat.
+    """
+    return f"{base_url}/send?phone={quote(user.phone, safe='')}&text={quote(msg, safe='')}"
+
+
+class WhatsAppSession:
+    """A single Chrome WebDriver that stays open for a whole send run.
+
+    Launching Chrome and loading WhatsApp Web from cold is by far the slowest part of sending a message, so the session launches Chrome once and then navigates from chat to chat with the "send?phone=" link. If Chrome crashes or is closed in the middle of a run, the next chat visit relaunches it automatically.
+
+    Can be used as a context manager so the browser is always closed at the end of a run:
+    ```
+    with WhatsAppSession() as session:
+        send_txtmsg(user, msg, session=session)
+    ```
+    """
+
+    def __init__(self, profile=None, mode=CHROME_MODE, base_url=WHATSAPP_WEB_URL):
+        """
+        Args:
+            profile (str, optional): The Chrome user-data-dir of this session. Defaults to the main "profile/wpp" directory.
+            mode (str, optional): Chrome option mode, "default" or "performance". Defaults to CHROME_MODE.
+            base_url (str, optional): base URL of WhatsApp Web, e.g., a local fake page for benchmarks. Defaults to WHATSAPP_WEB_URL.
+        """
+        self.profile = profile
+        self.mode = mode
+        self.base_url = base_url
+        self.driver = None
+        # Held while Chrome launches, so a launch started in the background is not duplicated.
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.quit()
+
+    def start(self):
+        """Launch Chrome with the ChromeDriver options if it is not running yet.
+
+        Returns:
+            WebDriver: The Chrome WebDriver object of this session.
+        """
+        from selenium import webdriver
+        with self.lock:
+            if self.driver is None:
+                with metrics.timer("chrome_launch"):
+                    self.driver = webdriver.Chrome(options=create_chromedriver_options(profile=self.profile, mode=self.mode))
+            return self.driver
+
+    def start_in_background(self):
+        """Launch Chrome in a background thread, so it loads while the caller gets the rest of the run ready. The next start() waits for it to finish.
+
+        If the launch fails, Chrome is launched again when the first chat is opened.
+        """
+        def launch():
+            try:
+                self.start()
+            except Exception as e:
+                print(f"Chrome could not be launched early, retrying when the first chat is opened: {e}")
+
+        if self.driver is None:
+            threading.Thread(target=launch, daemon=True).start()
+
+    def is_alive(self):
+        """Check if the browser of this session is still responding.
+
+        Returns:
+            bool: True if Chrome is running and reachable, otherwise False.
+        """
+        if self.driver is None:
+            return False
+        from selenium.common.exceptions import WebDriverException
+        try:
+            self.driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+
+    def restart(self):
+        """Throw away the (crashed) browser and launch a new one.
+
+        Returns:
+            WebDriver: The new Chrome WebDriver object.
+        """
+        print("Chrome is not responding, relaunching...")
+        self.quit()
+        return self.start()
+
+    def open_chat(self, user: Contact, msg=""):
+        """Navigate to a contact's chat, relaunching Chrome first if it has crashed.
+
+        Args:
+            user (Contact): User's details.
+            msg (str, optional): text message to pre-fill in the chat. Defaults to "".
+
+        Returns:
+            WebDriver: The Chrome WebDriver object showing the contact's chat.
+        """
+        from selenium.common.exceptions import WebDriverException
+        if self.driver is not None and not self.is_alive():
+            self.restart()
+        driver = self.start()
+        link = build_chat_link(user=user, msg=msg, base_url=self.base_url)
+        try:
+            with metrics.timer("open_chat"):
+                driver.get(link)
+        except WebDriverException:
+            metrics.inc("browser_relaunches")
+            driver = self.restart()
+            with metrics.timer("open_chat"):
+                driver.get(link)
+        return driver
+
+    def quit(self):
+        """Close Chrome. Errors are ignored as the browser may have already crashed.
+        """
+        if self.driver is None:
+            return
+        from selenium.common.exceptions import WebDriverException
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+        self.driver = None
+
+
+def load_selectors():
+    """Return the selector registry, with the candidates of resources/selectors.json (if present) tried before the built-in ones.
+
+    Returns:
+        dict: ordered lists of CSS selector candidates keyed by element name.
+    """
+    selectors = {name: list(candidates) for name, candidates in SELECTORS.items()}
+    if os.path.exists(SELECTORS_OVERRIDE_PATH):
+        with open(SELECTORS_OVERRIDE_PATH, "r") as f:
+            override = json.load(f)
+        print(f"Using selectors v{override.get('version')} from {SELECTORS_OVERRIDE_PATH}")
+        for name, candidates in override.get("selectors", {}).items():
+            selectors[name] = candidates + [c for c in selectors.get(name, []) if c not in candidates]
+    return selectors
+
+
+_selectors = None
+# Index of the candidate that matched last time, per element name.
+_selector_hits = {}
+
+
+def get_selectors():
+    """Return the selector registry, loading it on first use.
+
+    Returns:
+        dict: ordered lists of CSS selector candidates keyed by element name.
+    """
+    global _selectors
+    if _selectors is None:
+        _selectors = load_selectors()
+    return _selectors
+
+
+def selector_group(name: str):
+    """Join every candidate of a registry element into one CSS selector list, for elements that are counted or searched within (e.g., message bubbles) rather than waited for.
+
+    Args:
+        name (str): name of the element in the registry e.g., "outgoing_msg".
+
+    Returns:
+        str: the candidates separated by commas; an element matched by several of them is only found once.
+    """
+    return ", ".join(get_selectors()[name])
+
+
+def find_element(driver, name: str, timeout: float, clickable=True, **params):
+    """Wait for a WhatsApp Web element of the selector registry and return it.
+
+    Every poll tries all the candidates of the element at once (see match_element), starting with the one that matched last time, so when the first selector is outdated the fallbacks are found in the same poll instead of after a full timeout, and later recipients resolve on the first try.
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver object required
+        name (str): name of the element in the registry e.g., "send_btn".
+        timeout (float): Seconds to wait for any candidate to match.
+        clickable (bool, optional): only accept visible and enabled elements, otherwise any element present in the DOM (e.g., hidden file inputs). Defaults to True.
+        **params: values of the placeholders of the selectors e.g., title for "chat_search_result".
+
+    Returns:
+        WebElement: the element found.
+    """
+    from selenium.webdriver.support.wait import WebDriverWait
+    return WebDriverWait(driver, timeout, poll_frequency=0.2).until(
+        lambda driver: match_element(driver, name, clickable, **params) or False,
+        message=f"No selector of '{name}' (selectors v{SELECTOR_VERSION}) matched within {timeout}s")
+
+
+def match_element(driver, name: str, clickable=True, **params):
+    """Try every candidate of a registry element once, starting with the one that matched last time.
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver object required
+        name (str): name of the element in the registry e.g., "send_btn".
+        clickable (bool, optional): only accept visible and enabled elements. Defaults to True.
+        **params: values of the placeholders of the selectors. Defaults to none.
+
+    Returns:
+        WebElement: the element found, or None if no candidate matches right now.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import StaleElementReferenceException
+    candidates = get_selectors()[name]
+    if params:
+        candidates = [candidate.format(**params) for candidate in candidates]
+    last_hit = _selector_hits.get(name, 0)
+    for i in [last_hit] + [i for i in range(len(candidates)) if i != last_hit]:
+        for element in driver.find_elements(By.CSS_SELECTOR, candidates[i]):
+            try:
+                if not clickable or (element.is_displayed() and element.is_enabled()):
+                    _selector_hits[name] = i
+                    return element
+            except StaleElementReferenceException:
+                continue
+    return None
+
+
+def css_string(value: str):
+    """Quote a value as a CSS string, e.g., to match an attribute in a selector.
+
+    Only quotes, backslashes and control characters are escaped; any other character, including non-ASCII text and emoji, stands for itself in CSS.
+
+    Args:
+        value (str): the value e.g., a chat name.
+
+    Returns:
+        str: the value in double quotes, escaped.
+    """
+    escaped = []
+    for char in value:
+        if char == "\0":
+            escaped.append("\ufffd")
+        elif char < " " or char == "\x7f":
+            escaped.append(f"\\{ord(char):x} ")
+        elif char in "\"\\":
+            escaped.append("\\" + char)
+        else:
+            escaped.append(char)
+    return '"' + "".join(escaped) + '"'
+
+
+@timed("chat_load")
+def wait_for_chat(driver, timeout=None):
+    """Wait until the chat opened by a "send?phone=" link is ready, failing fast if WhatsApp reports the number as invalid.
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver object required
+        timeout (float, optional): Seconds to wait for the chat. Defaults to STEP_TIMEOUTS["chat_load"].
+
+    Raises:
+        SendError: with reason INVALID_NUMBER if the number is not on WhatsApp.
+    """
+    from selenium.webdriver.support.wait import WebDriverWait
+
+    def chat_ready(driver):
+        popup = match_element(driver, "invalid_number_popup")
+        if popup is not None and "invalid" in popup.text.lower():
+            return INVALID_NUMBER
+        return match_element(driver, "plus_btn") is not None
+
+    timeout = timeout or STEP_TIMEOUTS["chat_load"]
+    state = WebDriverWait(driver, timeout, poll_frequency=0.2).until(
+        chat_ready, message=f"Chat did not load within {timeout}s")
+    if state == INVALID_NUMBER:
+        raise SendError(INVALID_NUMBER, "WhatsApp reports the phone number as invalid")
+
+
+@timed("click_plus_btn")
+def click_plus_btn_in_chat(driver, timeout=None):
+    """Find the "+" button next to the message text box and click it.
+
+    This is the first element waited for after navigating to a chat, so it uses the "chat_load" timeout.
 
     Args:
         driver (WebDriver): The Chrome WebDriver object required.
+        timeout (float, optional): Seconds to wait for the button. Defaults to STEP_TIMEOUTS["chat_load"].
     """
-    plus_btn_selector = "#main > footer > div._2lSWV._3cjY2.copyable-area > div > span:nth-child(2) > div > div._2xy_p._1bAtO > div._1OT67 > div > div"
-    # TODO: experiment with the wait time to improve speed.
-    plus_btn = WebDriverWait(driver, 20).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, plus_btn_selector))
-    )
-    plus_btn.click()
-    
+    find_element(driver, "plus_btn", timeout or STEP_TIMEOUTS["chat_load"]).click()
     
-def click_send_photo_btn(driver):
-    """Find the "Photos & Videos" button by its CSS selector and click it.
     
-    Note: increase sleep time for demo purposes. 
+@timed("click_send_photo_btn")
+def click_send_photo_btn(driver, timeout=None, on_click=None):
+    """Find the send button of the photo preview, click it and wait until the photo is sent.
+
+    The send button only becomes clickable once the upload preview has been rendered, so no fixed sleep is needed before or after clicking it.
 
     Args:
         driver (WebDriver): The Chrome WebDriver object required
+        timeout (float, optional): Seconds to wait for the upload preview. Defaults to STEP_TIMEOUTS["upload_preview"].
+        on_click (callable, optional): called right after the click, before waiting for the sent tick. Defaults to None.
+
+    Raises:
+        SendError: with reason UNCONFIRMED if the sent tick does not show.
     """
-    selector = "#app > div > div.two._1jJ70 > div._2QgSC > div._2Ts6i._2xAQV > span > div > span > div > div > div.g0rxnol2.thghmljt.p357zi0d.rjo8vgbg.ggj6brxn.f8m0rgwh.gfz4du6o.r7fjleex.bs7a17vp > div > div.O2_ew > div._3wFFT > div > div"
-    # TODO: experiment with the wait time to improve speed.
-    send_btn = WebDriverWait(driver, 17).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+    send_btn = find_element(driver, "preview_send_btn", timeout or STEP_TIMEOUTS["upload_preview"])
+    sent_before = count_outgoing_msgs(driver)
     send_btn.click()
-    sleep(5)
+    if on_click is not None:
+        on_click()
+    wait_for_msg_sent(driver, sent_before)
 
 
-def click_send_btn(driver):
-    """Find the ">" (send) button by its CSS selector and click it.
+@timed("click_send_btn")
+def click_send_btn(driver, timeout=None, on_click=None):
+    """Find the ">" (send) button, click it and wait until the message is sent.
 
-    Note: increase sleep time for demo purposes. 
+    This is the first element waited for after navigating to a chat, so it uses the "chat_load" timeout.
     
     Args:
         driver (WebDriver): The Chrome WebDriver object required
+        timeout (float, optional): Seconds to wait for the button. Defaults to STEP_TIMEOUTS["chat_load"].
+        on_click (callable, optional): called right after the click, before waiting for the sent tick. Defaults to None.
+
+    Raises:
+        SendError: with reason UNCONFIRMED if the sent tick does not show.
     """
-    selector = "#main > footer > div._2lSWV._3cjY2.copyable-area > div > span:nth-child(2) > div > div._1VZX7 > div._2xy_p._3XKXx > button"
-    # TODO: experiment with the wait time to improve speed.
-    send_btn = WebDriverWait(driver, 17).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+    send_btn = find_element(driver, "send_btn", timeout or STEP_TIMEOUTS["chat_load"])
+    sent_before = count_outgoing_msgs(driver)
     send_btn.click()
-    sleep(5)
+    if on_click is not None:
+        on_click()
+    wait_for_msg_sent(driver, sent_before)
+
+
+def count_outgoing_msgs(driver):
+    """Count the outgoing message bubbles currently rendered in the open chat.
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver object required
+
+    Returns:
+        int: Number of outgoing message bubbles.
+    """
+    from selenium.webdriver.common.by import By
+    return len(driver.find_elements(By.CSS_SELECTOR, selector_group("outgoing_msg")))
+
+
+@timed("send_confirm")
+def wait_for_msg_sent(driver, sent_before: int, timeout=None):
+    """Wait until a new outgoing message bubble appears and WhatsApp has moved it from pending (clock icon) to sent (tick icon).
+
+    Leaving the chat or closing Chrome while a message is still pending can drop it, so this replaces the fixed sleep after clicking a send button: the wait ends as soon as the page confirms the message.
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver object required
+        sent_before (int): Number of outgoing message bubbles before the send button was clicked.
+        timeout (float, optional): Seconds to wait for the sent tick. Defaults to STEP_TIMEOUTS["send_confirm"].
+
+    Raises:
+        SendError: with reason UNCONFIRMED if the sent tick does not show in time. The message may still have gone out, so it must not be sent again.
+    """
+    from selenium.common.exceptions import TimeoutException
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.wait import WebDriverWait
+    def msg_sent(driver):
+        bubbles = driver.find_elements(By.CSS_SELECTOR, selector_group("outgoing_msg"))
+        if len(bubbles) <= sent_before:
+            return False
+        return len(bubbles[-1].find_elements(By.CSS_SELECTOR, selector_group("sent_tick"))) > 0
+
+    timeout = timeout or STEP_TIMEOUTS["send_confirm"]
+    try:
+        WebDriverWait(driver, timeout).until(msg_sent)
+    except TimeoutException as e:
+        raise SendError(UNCONFIRMED, f"no sent tick within {timeout}s of clicking send") from e
 
 
 def generate_cur_date():
@@ -295,55 +913,104 @@ def generate_msg():
         str: user's custom message.
     """
     msg = input(
-        "Enter your msg here\n(If you want to add someone's name, type zzzz as a placeholder)\n> ")
+        "Enter your msg here\n(If you want to add someone's name, type {name} or {first_name} as a placeholder, {tag} for their tag)\n> ")
     return msg
 
 
+@timed("local_load_contacts")
 def generate_users_from_local():
     """Generate all user details from contact.json stored in the local directory and put them in a list
 
-    The list consists of: contact key, contact name, contact phone number, contact's birthday, contact tag
+    Each entry is a Contact record with the contact key, name, phone number, birthday and tag.
 
     Returns:
-        list: A list of contact details [key, name, phone number, birthday, tag]
+        list: A list of Contact records.
     """
     try:
-        if is_encrypted(CONTACT_PATH_LOCAL, CONTACT_KEY_NAME) or is_encrypted("resources/msgDOWNLOAD.txt", MSG_KEY_NAME):
-            decrypt_json(CONTACT_PATH_LOCAL, CONTACT_KEY_NAME)
-            with open(CONTACT_PATH_LOCAL) as f:
-                data = json.load(f)
-            encrypt_json(CONTACT_PATH_LOCAL, CONTACT_KEY_NAME)
-            return convert_contact_dict_to_nested_list(data)
+        if is_encrypted(CONTACT_PATH_LOCAL):
+            return list(stream_contacts_from_local())
         else:
             print("contacts.json is not encrypted!")
     except Exception as e:
         print(f"An error occurred when trying to load local contact.json: {e}")
 
 
+def stream_contacts_from_local(tag=None, bday=None):
+    """Yield the contacts of the encrypted contact.json one by one, optionally filtered by tag and birthday.
+
+    The file is decrypted in memory. If ijson is installed, the JSON is parsed incrementally so the whole contact dictionary is never built; otherwise it is parsed in one go.
+
+    Args:
+        tag (str, optional): only yield contacts with this tag; None or "all" yields every tag. Defaults to None.
+        bday (datetime.date, optional): only yield contacts whose birthday message is due on this date. Defaults to None.
+
+    Yields:
+        Contact: a contact's details.
+    """
+    data = decrypt_to_bytes(CONTACT_PATH_LOCAL, CONTACT_KEY_NAME)
+    try:
+        import io
+        import ijson
+        pairs = ijson.kvitems(io.BytesIO(data), "")
+    except ImportError:
+        pairs = json.loads(data).items()
+    yield from iter_contacts(pairs, tag=tag, bday=bday)
+
+
+@timed("mongo_load_contacts")
 def generate_users_from_mongodb():
     """Retrieve users' details from Azure Cosmos DB for MongoDB database and transform them to a nested list of contact information.
 
     Returns:
-        list: A list of contact details [key, name, phone number, birthday, tag]
+        list: A list of Contact records.
     """
-    data_raw_with_id = get_document_from_azure_mongodb()
+    return list(stream_contacts_from_mongodb())
+
 
-    # Omit 1st iteration of _id and add rest of dict to a new dict, then save it to a temp json file for future reads (while the program is still running).
-    # TODO: work directly with the data structure received from Azure database, manipulate it to a new dictionary without the _id field.
-    data_raw_no_id = {key: value for index,
-                      (key, value) in enumerate(data_raw_with_id.items()) if index > 0}
+def stream_contacts_from_mongodb(tag=None, bday=None):
+    """Yield the contacts stored in Azure Cosmos DB for MongoDB one by one, straight from a cursor, optionally filtered by tag and birthday on the server.
+
+    In "per_contact" storage mode this is a query on the contact collection. Otherwise the contacts are fields of a single document, so the document is unwound into one entry per contact on the server and the entries are streamed back in batches of MONGO_BATCH_SIZE.
+
+    Args:
+        tag (str, optional): only yield contacts with this tag; None or "all" yields every tag. Defaults to None.
+        bday (datetime.date, optional): only yield contacts whose birthday message is due on this date. Defaults to None.
+
+    Yields:
+        Contact: a contact's details.
+    """
+    tag = None if tag == "all" else tag
+    bdays = due_bday_strings(bday) if bday else None
     try:
-        with open(TEMP_PATH, 'w') as f:
-            json.dump(data_raw_no_id, f, indent=2)
-        with open(TEMP_PATH, "r") as f:
-            data = json.load(f)
-            # encrypt_json(TEMP_PATH)
+        if CONTACT_STORAGE_MODE == "per_contact":
+            query = {}
+            if tag:
+                query["tag"] = tag
+            if bdays:
+                query.update({"bday_month": bday.month, "bday_day": {"$in": [int(b[-2:]) for b in bdays]}, "bday": {"$in": bdays}})
+            projection = {"name": 1, "number": 1, "bday": 1, "tag": 1}
+            cursor = get_contact_collection().find(query, projection, batch_size=MONGO_BATCH_SIZE)
+            pairs = ((doc.pop("_id"), doc) for doc in cursor)
+        else:
+            match = {"contacts.k": {"$ne": "_id"}}
+            if tag:
+                match["contacts.v.tag"] = tag
+            if bdays:
+                match["contacts.v.bday"] = {"$in": bdays}
+            pipeline = [
+                {"$project": {"contacts": {"$objectToArray": "$$ROOT"}}},
+                {"$unwind": "$contacts"},
+                {"$match": match},
+                {"$project": {"_id": 0, "key": "$contacts.k", "value": "$contacts.v"}},
+            ]
+            cursor = get_collection().aggregate(pipeline, batchSize=MONGO_BATCH_SIZE)
+            pairs = ((entry["key"], entry["value"]) for entry in cursor)
+        yield from iter_contacts(pairs)
     except Exception as e:
-        print(f"An error occurred when trying to load temp json file: {e}")
-        return
-    return convert_contact_dict_to_nested_list(data)
+        print(f"An error has occurred when trying to read contacts from Azure: {e}")
 
 
+@timed("mongo_find_document")
 def get_document_from_azure_mongodb():
     """Return a document from Azure Cosmos DB for MongoDB as a dictionary.
     
@@ -361,22 +1028,123 @@ def get_document_from_azure_mongodb():
 
 
 def convert_contact_dict_to_nested_list(data):
-    """Once data has been retrieved from Azure MongoDB, it is transformed to a nested list in this function.
-    
-    No need to skip the 1st iteration unlike dealing with contact.json from local directory because we already extracted the json data without _id to the temp file. 
+    """Once data has been retrieved from Azure MongoDB or the local contact.json, it is transformed to a nested list in this function.
+
+    The "_id" field of a MongoDB document is skipped.
 
     Args:
         data (dict): a dictionary of contact details
 
     Returns:
-        list: a list of user details [key, name, phone number, birthday, tag]
+        list: a list of Contact records.
+    """
+    return list(iter_contacts(data.items()))
+
+
+def iter_contacts(pairs, tag=None, bday=None):
+    """Turn (contact key, contact details) pairs into Contact records lazily, applying the filters on the raw details so skipped contacts are never parsed.
+
+    Args:
+        pairs (iterable): (key, dict of name, number, bday and tag) pairs.
+        tag (str, optional): only yield contacts with this tag; None or "all" yields every tag. Defaults to None.
+        bday (datetime.date, optional): only yield contacts whose birthday message is due on this date. Defaults to None.
+
+    Yields:
+        Contact: a contact's details.
+    """
+    bdays = due_bday_strings(bday) if bday else None
+    for key, value in pairs:
+        if key == "_id":
+            continue
+        if tag and tag != "all" and value["tag"] != tag:
+            continue
+        if bdays and value["bday"] not in bdays:
+            continue
+        _, month, day = (int(part) for part in value["bday"].split("-"))
+        yield Contact(key, value["name"], value["number"], parse_bday(value["bday"]), value["tag"], bday_month=month, bday_day=day)
+
+
+def due_bday_strings(current_date):
+    """Return the stored birthdays ("yyyy-mm-dd") whose message is due on a date: the date itself, plus 29 Feb on 28 Feb of a non-leap year.
+
+    Args:
+        current_date (datetime.date): the date of the run.
+
+    Returns:
+        list: birthdays in yyyy-mm-dd format.
+    """
+    bdays = [current_date.strftime("%Y-%m-%d")]
+    if (current_date.month, current_date.day) == (2, 28) and not is_leap_year(current_date.year):
+        bdays.append(f"{current_date.year}-02-29")
+    return bdays
+
+
+def parse_bday(bday: str):
+    """Parse a birthday stored as "yyyy-mm-dd".
+
+    The year is the next year the birthday message is due (see increment_year), so a 29 Feb birthday can be stored with a non-leap year. Such a birthday is celebrated on 28 Feb of that year.
+
+    Args:
+        bday (str): birthday in yyyy-mm-dd format.
+
+    Returns:
+        datetime.date: the date the birthday message is due.
+    """
+    try:
+        return dt.strptime(bday, "%Y-%m-%d").date()
+    except ValueError:
+        year, month, day = (int(part) for part in bday.split("-"))
+        if (month, day) == (2, 29) and not is_leap_year(year):
+            return datetime.date(year, 2, 28)
+        raise
+
+
+def build_bday_index(user_list: list):
+    """Index a contact list by birthday month and day, so a run only has to look at today's celebrants.
+
+    Args:
+        user_list (list): a list of Contact records.
+
+    Returns:
+        dict: lists of Contact records keyed by (month, day) of their stored birthday.
+    """
+    bday_index = {}
+    for user in user_list:
+        bday_index.setdefault((user.bday_month, user.bday_day), []).append(user)
+    return bday_index
+
+
+def find_bday_celebrants(bday_index: dict, current_date):
+    """Look up the contacts whose birthday message is due today.
+
+    A contact is due when their birthday falls on today's month and day and the stored year is this year (i.e. the message has not been sent yet this year). 29 Feb birthdays are celebrated on 28 Feb in non-leap years.
+
+    Args:
+        bday_index (dict): index built by build_bday_index.
+        current_date (datetime.date): today's date.
+
+    Returns:
+        list: Contact records of today's celebrants.
     """
-    contact_list = []    
-    for key, value in data.items():
-        user_info = [key, value["name"], value["number"],
-                     dt.strptime(value["bday"], "%Y-%m-%d").date(), value["tag"]]
-        contact_list.append(user_info)
-    return contact_list
+    candidates = list(bday_index.get((current_date.month, current_date.day), []))
+    if (current_date.month, current_date.day) == (2, 28) and not is_leap_year(current_date.year):
+        candidates += bday_index.get((2, 29), [])
+    return [user for user in candidates if user.bday.year == current_date.year]
+
+
+@timed("mongo_find_bdays")
+def generate_bday_users_from_mongodb(current_date):
+    """Ask Azure Cosmos DB for MongoDB for the contacts whose birthday message is due today, instead of downloading every contact.
+
+    In "per_contact" storage mode this is an indexed query on the birthday month and day. Otherwise the contacts are fields of a single document, so the document is unwound into one entry per contact on the server and only the entries whose birthday matches are sent back.
+
+    Args:
+        current_date (datetime.date): today's date.
+
+    Returns:
+        list: Contact records of today's celebrants.
+    """
+    return list(stream_contacts_from_mongodb(bday=current_date))
 
 
 # -----below for testing-----
@@ -386,216 +1154,885 @@ def convert_contact_dict_to_nested_list(data):
 # decrypt_json("resources/msgDOWNLOAD.txt", key_name="resources/msg.key")
 
     
-def send_txtmsg(user: list, msg=""):
+def send_txtmsg(user: Contact, msg="", session=None, done=None):
     """Send automated message via WhatsApp Web to a phone number.
 
     Args:
-        user (list): user details including user key, user name, user phone number and user birthday.
+        user (Contact): user details including user key, user name, user phone number and user birthday.
         msg (str): message to be sent.
+        session (WhatsAppSession, optional): the browser session to send with. If None, a browser is launched just for this message and closed afterwards. Defaults to None.
+        done (set, optional): parts already sent by an earlier attempt (see compose_msg). Defaults to None.
+
+    Raises:
+        SendError: if the number is invalid or the message was sent but not confirmed.
     """
-    driver = open_whatsapp_web(user=user, msg=msg)
-    click_send_btn(driver=driver)
-    driver.quit()
+    compose_msg(user, session=session, text=msg, done=done)
     
 
-def send_photo(user, msg=""):
+@timed("send_photo")
+def send_photo(user, msg="", session=None, photo_path=PHOTO_PATH):
     """Send photo via WhatsApp Web to a phone number.
 
     Args:
-        user (list): User's details
+        user (Contact): User's details
         msg (str, optional): Caption for the photo which is optional. Defaults to "".
+        session (WhatsAppSession, optional): the browser session to send with. If None, a browser is launched just for this photo and closed afterwards. Defaults to None.
+        photo_path (str, optional): path to the photo. Defaults to the downloaded birthday meme.
     """
-    driver = open_whatsapp_web(user=user, msg=msg)
+    compose_msg(user, session=session, photo=photo_path, caption=msg)
+  
+
+def send_documents(user, msg="", session=None, doc_paths=(DOC_PATH,)):
+    """Send documents via WhatsApp Web to a phone number, optionally preceded by a text message.
+
+    Args:
+        user (Contact): User's details
+        msg (str, optional): text message sent before the documents. Defaults to "".
+        session (WhatsAppSession, optional): the browser session to send with. If None, a browser is launched just for these documents and closed afterwards. Defaults to None.
+        doc_paths (tuple, optional): paths to the documents. Defaults to the document downloaded by get_doc_from_blob.
+    """
+    compose_msg(user, session=session, text=msg, documents=doc_paths)
+
+
+@timed("compose_msg")
+def compose_msg(user: Contact, session=None, text="", photo=None, caption="", documents=(), done=None):
+    """Send any mix of a text message, a photo with a caption and documents to a contact in a single chat visit.
+
+    The chat is opened once (with the text pre-filled through the "send?phone=" link) and every part is sent from that same page, instead of reloading WhatsApp Web for each part.
+
+    Args:
+        user (Contact): User's details
+        session (WhatsAppSession, optional): the browser session to send with. If None, a browser is launched just for this visit and closed afterwards. Defaults to None.
+        text (str, optional): text message. Defaults to "".
+        photo (str, optional): path to a photo. Defaults to None.
+        caption (str, optional): caption of the photo. Defaults to "".
+        documents (tuple, optional): paths to documents. Defaults to ().
+        done (set, optional): parts already sent by an earlier attempt, which are skipped; a part is added to it as soon as its send button is clicked, so a retry never sends it twice. Defaults to None.
+
+    Raises:
+        SendError: if the number is invalid, a photo/document could not be uploaded or a sent part was not confirmed.
+    """
+    if session is None:
+        with WhatsAppSession() as session:
+            return compose_msg(user, session=session, text=text, photo=photo, caption=caption, documents=documents, done=done)
+    done = set() if done is None else done
+    send_text = text and "text" not in done
+    if not send_text and (not photo or "photo" in done) and all(f"document{i}" in done for i in range(len(documents))):
+        return
+    driver = session.open_chat(user=user, msg=text if send_text else "")
+    wait_for_chat(driver)
+    if send_text:
+        click_send_btn(driver=driver, on_click=lambda: done.add("text"))
+    if photo and "photo" not in done:
+        attach_and_send(driver, "photos", photo, caption=caption, on_click=lambda: done.add("photo"))
+    for i, document in enumerate(documents):
+        if f"document{i}" not in done:
+            attach_and_send(driver, "document", document, on_click=lambda i=i: done.add(f"document{i}"))
 
+
+@timed("upload")
+def attach_and_send(driver, kind: str, path: str, caption="", on_click=None):
+    """Attach a file to the open chat through the "+" menu and send it. Photos are resized and compressed first (see media.prepare_image).
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver object required
+        kind (str): entry of the "+" menu, "photos" or "document".
+        path (str): path to the file.
+        caption (str, optional): caption typed in the upload preview. Defaults to "".
+        on_click (callable, optional): called right after the send button is clicked. Defaults to None.
+
+    Raises:
+        SendError: with reason UPLOAD_FAILED if the file could not be attached, or UNCONFIRMED if it was sent but not confirmed.
+    """
+    from selenium.common.exceptions import TimeoutException
+    if kind == "photos":
+        path = prepare_image(path)
     click_plus_btn_in_chat(driver=driver)
+    find_element(driver, f"attach_{kind}_btn", STEP_TIMEOUTS["attach_menu"]).click()
     
-    photos_btn_selector = "#main > footer > div._2lSWV._3cjY2.copyable-area > div > span:nth-child(2) > div > div._2xy_p._1bAtO > div._1OT67 > div > span > div > ul > div > div:nth-child(2) > li > div"
-    photo_btn = WebDriverWait(driver, 10).until(
-        EC.presence_of_element_located((By.CSS_SELECTOR, photos_btn_selector))
-    )
-    photo_btn.click()
-    
-    sleep(3)
     try:
-        file_upload_selector = "#main > footer > div._2lSWV._3cjY2.copyable-area > div > span:nth-child(2) > div > div._2xy_p._1bAtO > div._1OT67 > div > span > div > ul > div > div:nth-child(2) > li > div > input[type=file]"
-        file_upload = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, file_upload_selector))
-        )
-        file_upload.send_keys(os.path.abspath("resources/bday_memeDOWNLOAD.jpg"))
-        sleep(3)
-        click_send_photo_btn(driver=driver)
-        sleep(6)
-        driver.quit()
-    except TimeoutError as e:
-        print(f"Exception: {e}")
-  
+        file_upload = find_element(driver, f"attach_{kind}_input", STEP_TIMEOUTS["attach_menu"], clickable=False)
+        file_upload.send_keys(os.path.abspath(path))
+        if caption:
+            # Line breaks are typed with Shift+Enter, as a plain Enter would send the photo before on_click records it.
+            type_msg(find_element(driver, "caption_box", STEP_TIMEOUTS["upload_preview"]), caption)
+        click_send_photo_btn(driver=driver, on_click=on_click)
+    except TimeoutException as e:
+        raise SendError(UPLOAD_FAILED, f"could not send {os.path.basename(path)}: {e.msg}") from e
+
+
+def classify_send_error(error: Exception, session=None):
+    """Classify why sending to a recipient failed.
+
+    A WebDriver error only counts as a browser crash if the browser is gone; errors of a healthy browser (e.g., a click intercepted by an overlay or a stale element) are UI errors, retried in the same browser.
+
+    Args:
+        error (Exception): the error raised while sending.
+        session (WhatsAppSession, optional): the session the error was raised in, checked to tell a crash from a UI error. Defaults to None (only errors about the window or the WebDriver session count as crashes).
+
+    Returns:
+        str: INVALID_NUMBER, UPLOAD_FAILED, SELECTOR_TIMEOUT, BROWSER_CRASH, UI_ERROR, UNCONFIRMED or UNKNOWN_ERROR.
+    """
+    if isinstance(error, SendError):
+        return error.reason
+    from selenium.common.exceptions import TimeoutException, WebDriverException, InvalidSessionIdException, NoSuchWindowException
+    if isinstance(error, TimeoutException):
+        return SELECTOR_TIMEOUT
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException)):
+        return BROWSER_CRASH
+    if isinstance(error, WebDriverException):
+        return BROWSER_CRASH if session is not None and not session.is_alive() else UI_ERROR
+    return UNKNOWN_ERROR
+
+
+def failed_queue_status(error: Exception):
+    """Return the send queue status of a job that failed with an error.
+
+    Args:
+        error (Exception): the error raised while sending.
+
+    Returns:
+        str: UNCONFIRMED if the message may have gone out (so a resumed campaign does not send it again), otherwise FAILED.
+    """
+    return QUEUE_UNCONFIRMED if classify_send_error(error) == UNCONFIRMED else QUEUE_FAILED
+
+
+def send_with_retry(task, session, user: Contact, max_attempts=SEND_MAX_ATTEMPTS, base_delay=SEND_RETRY_BASE_DELAY):
+    """Run a send task, retrying transient failures (timeouts, failed uploads, UI errors, browser crashes) with exponential backoff.
+
+    Invalid numbers, unconfirmed sends and unexpected errors are not retried. After a browser crash the session's browser is closed, so the next attempt starts a new one.
+
+    Args:
+        task (callable): task(session, user) sending to one contact.
+        session (WhatsAppSession): the browser session to send with.
+        user (Contact): a contact's details.
+        max_attempts (int, optional): attempts before giving up. Defaults to SEND_MAX_ATTEMPTS.
+        base_delay (float, optional): seconds to wait before the 1st retry, doubled for every further retry. Defaults to SEND_RETRY_BASE_DELAY.
 
-def send_documents(user, msg=""):
-    pass
+    Raises:
+        SendError: with the reason of the last failure once the attempts are used up or the failure is not transient.
+    """
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return task(session, user)
+        except Exception as e:
+            reason = classify_send_error(e, session)
+            if reason == BROWSER_CRASH:
+                session.quit()
+            elif reason == INVALID_NUMBER:
+                # Skipped by the planning stage of the next campaigns.
+                unregistered_numbers.add(user.phone)
+            metrics.inc(f"send_attempt_failed_{reason}")
+            if reason not in TRANSIENT_FAILURES or attempt == max_attempts:
+                if isinstance(e, SendError):
+                    raise
+                raise SendError(reason, str(e)) from e
+            delay = base_delay * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+            print(f"Sending to {user.name} failed ({reason}), retrying in {delay:.1f}s")
+            time.sleep(delay)
   
 
-def update_year_in_local(user: list):
+def update_year_in_local(user: Contact):
     """Increment user's birthday year by one after birthday message is sent and update list of user details (json)
 
     Args:
-        user (list): user details including user key, user name, user phone number and user birthday.
+        user (Contact): user details including user key, user name, user phone number and user birthday.
+
+    Returns:
+        dict: updated contact list.
     """
-    with open(CONTACT_PATH_LOCAL, "r") as f:
-        decrypt_json(CONTACT_PATH_LOCAL, CONTACT_KEY_NAME)
-        data = json.load(f)
-    
-    bday_year_increment_update = increment_year(user)
-    data[user[0]]["bday"] = bday_year_increment_update
-    
-    with open(CONTACT_PATH_LOCAL, "w") as f:
-        json.dump(data, f, indent=2)
-    encrypt_json(CONTACT_PATH_LOCAL, CONTACT_KEY_NAME)
-    return data
+    return write_bdays_to_local({user.key: increment_year(user)})
+
+
+def update_year_in_cloud(user: Contact):
+    """Increment user's birthday year by one after birthday message is sent and update only that birthday in Azure Cosmos DB for MongoDB.
+
+    Args:
+        user (Contact): user details including user key, user name, user phone number and user birthday.
+
+    Returns:
+        dict: the updated birthday keyed by contact key.
+    """
+    return write_bdays_to_cloud({user.key: increment_year(user)})
 
 
-def update_year_in_cloud(user: list):
-    """_summary_
+@timed("local_write_bdays")
+def write_bdays_to_local(bdays: dict):
+    """Update the birthdays of several contacts in contacts.json with a single read and write, decrypting and encrypting in memory.
 
     Args:
-        user (_type_): _description_
+        bdays (dict): new birthdays in yyyy-mm-dd format keyed by contact key.
 
     Returns:
-        _type_: _description_
+        dict: updated contact list.
     """
-    with open(TEMP_PATH, "r") as f:
-        data = json.load(f)
+    data = json.loads(decrypt_to_bytes(CONTACT_PATH_LOCAL, CONTACT_KEY_NAME))
 
-    bday_year_increment_update = increment_year(user)
-    data[user[0]]["bday"] = bday_year_increment_update
+    for key, bday in bdays.items():
+        data[key]["bday"] = bday
     
-    with open(TEMP_PATH, "w") as f:
-        json.dump(data, f, indent=2)
-        
-    # If you go into Azure Cosmos DB for MongoDB account (RU) Data Explorer sometimes you have refresh the entire tab (rather than just the refresh button for the document) to see the updated results. This is probably a bug from Microsoft :(
-    collection = get_collection()
-    collection.update_one({"_id": ObjectId(DOCUMENT_ID)}, {"$set": data})
+    encrypt_bytes_to_file(json.dumps(data, indent=2).encode(), CONTACT_PATH_LOCAL, CONTACT_KEY_NAME)
     return data
 
 
-def send_bday_msgs_from_local(user_list, msg: str):
+@timed("mongo_write_bdays")
+def write_bdays_to_cloud(bdays: dict):
+    """Update the birthdays of several contacts in Azure Cosmos DB for MongoDB with a single bulk write, setting only the birthday fields.
+
+    Args:
+        bdays (dict): new birthdays in yyyy-mm-dd format keyed by contact key.
+
+    Returns:
+        dict: the updated birthdays keyed by contact key.
+    """
+    from bson import ObjectId
+    from pymongo import UpdateOne
+    # If you go into Azure Cosmos DB for MongoDB account (RU) Data Explorer sometimes you have refresh the entire tab (rather than just the refresh button for the document) to see the updated results. This is probably a bug from Microsoft :(
+    if CONTACT_STORAGE_MODE == "per_contact":
+        requests = [UpdateOne({"_id": key}, {"$set": {"bday": bday}}) for key, bday in bdays.items()]
+        get_contact_collection().bulk_write(requests, ordered=False)
+    else:
+        fields = {f"{key}.bday": bday for key, bday in bdays.items()}
+        get_collection().bulk_write([UpdateOne({"_id": ObjectId(DOCUMENT_ID)}, {"$set": fields})])
+    return {key: {"bday": bday} for key, bday in bdays.items()}
+
+
+BDAY_WRITERS = {"local": write_bdays_to_local, "cloud": write_bdays_to_cloud}
+
+
+class BdayUpdateJournal:
+    """Collects the birthday year updates of a run in memory and writes them all at once at the end of the run.
+
+    Every update is also appended to a journal file as soon as it is recorded. If the program dies before the end of the run, replay_bday_journal applies the updates left in the journal at the start of the next run, so contacts who already got their message are not messaged twice. The journal is deleted once the updates are written.
+    """
+
+    def __init__(self, target: str, path=JOURNAL_PATH):
+        """
+        Args:
+            target (str): where the contacts are stored, "local" or "cloud".
+            path (str, optional): path to the journal file. Defaults to JOURNAL_PATH.
+        """
+        self.target = target
+        self.path = path
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def record(self, user: Contact):
+        """Record that a contact's birthday year has to be incremented. Safe to call from several worker threads.
+
+        Args:
+            user (Contact): a contact's details.
+        """
+        bday = increment_year(user)
+        with self.lock:
+            self.pending[user.key] = bday
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"target": self.target, "key": user.key, "bday": bday}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def flush(self):
+        """Write every pending update with a single write to the contact storage and clear the journal.
+
+        Returns:
+            dict: the value returned by the storage writer, or an empty dict if there was nothing to write.
+        """
+        with self.lock:
+            if not self.pending:
+                return {}
+            updated_data = BDAY_WRITERS[self.target](self.pending)
+            self.pending = {}
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            return updated_data
+
+
+def replay_bday_journal(path=JOURNAL_PATH):
+    """Apply the birthday updates left in the journal by a run that did not finish.
+
+    Writing a birthday is idempotent (the new value is stored, not incremented again), so replaying a journal that was partly written before the crash is safe.
+
+    Args:
+        path (str, optional): path to the journal file. Defaults to JOURNAL_PATH.
+
+    Returns:
+        dict: the replayed birthdays keyed by contact key.
+    """
+    if not os.path.exists(path):
+        return {}
+    by_target = {}
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line may be cut off if the program died while writing it.
+                continue
+            by_target.setdefault(entry["target"], {})[entry["key"]] = entry["bday"]
+    replayed = {}
+    for target, bdays in by_target.items():
+        print(f"Replaying {len(bdays)} unsaved bday update(s) from the last run")
+        BDAY_WRITERS[target](bdays)
+        replayed.update(bdays)
+    os.unlink(path)
+    return replayed
+
+
+def send_bday_greeting(session, user: Contact, msg: str, journal=None, done=None, photo=PHOTO_PATH):
+    """Send the birthday message followed by the birthday photo to a contact, in a single chat visit.
+
+    Args:
+        session (WhatsAppSession): the browser session to send with.
+        user (Contact): a contact's details.
+        msg (str): the birthday message, already customized for the contact.
+        journal (BdayUpdateJournal, optional): journal recording the contact's birthday year update once the greeting is sent. Defaults to None.
+        done (set, optional): parts of the greeting already sent by an earlier attempt (see compose_msg). Defaults to None.
+        photo (str, optional): path to the birthday photo. Defaults to the downloaded birthday meme.
+
+    Raises:
+        SendError: if the greeting failed. An UNCONFIRMED greeting is never sent again, so its birthday year update is recorded before the error is raised; otherwise the contact would never be a celebrant again.
+    """
+    try:
+        compose_msg(user, session=session, text=msg, photo=photo, done=done)
+    except SendError as e:
+        if e.reason == UNCONFIRMED and journal is not None:
+            journal.record(user)
+        raise
+    if journal is not None:
+        journal.record(user)
+
+
+def run_send_jobs(jobs: list, session=None, workers=MAX_WORKERS):
+    """Run send jobs one after the other in a single browser session, or in parallel with a pool of browser workers.
+
+    Transient failures are retried (see send_with_retry) and a failing recipient is recorded in the report without stopping the run.
+
+    Args:
+        jobs (list): (user, task) pairs where task(session, user) sends to one contact.
+        session (WhatsAppSession, optional): the session used when sending sequentially, or by the 1st worker of a pool as it holds the main Chrome profile. If None, one is created and closed at the end of the run. Defaults to None.
+        workers (int, optional): number of browsers sending at the same time; 1 sends sequentially. Defaults to MAX_WORKERS.
+
+    Returns:
+        SendReport: the outcome of every job, keyed by contact key.
+    """
+    jobs = [(user, lambda session, user, task=task: send_with_retry(task, session, user)) for user, task in jobs]
+    if workers > 1:
+        session_factory = WhatsAppSession
+        if session is not None:
+            # The workers open the same WhatsApp Web as the given session.
+            session_factory = lambda profile: WhatsAppSession(profile, mode=session.mode, base_url=session.base_url)
+        report = run_in_pool(jobs, session_factory=session_factory, workers=workers, sends_per_minute=SENDS_PER_MINUTE, session=session)
+        count_send_outcomes(report)
+        return report
+    if session is None:
+        with WhatsAppSession() as session:
+            return run_send_jobs(jobs, session=session, workers=workers)
+    report = SendReport()
+    for user, task in jobs:
+        try:
+            task(session, user)
+            report.record(user.key, SENT)
+        except Exception as e:
+            report.record(user.key, FAILED, e)
+    count_send_outcomes(report)
+    return report
+
+
+def count_send_outcomes(report):
+    """Add the outcomes of a send run to the run metrics counters.
+
+    Args:
+        report (SendReport): the outcome of every job.
+    """
+    metrics.inc("msgs_sent", len(report.sent))
+    metrics.inc("msgs_failed", len(report.failed))
+    for reason, count in report.failure_reasons().items():
+        metrics.inc(f"msgs_failed_{reason}", count)
+
+
+def plan_campaign(campaign: str, users: list, msgs, report, workers=1):
+    """Run the planning stage of a campaign (see planner.plan_sends), print the plan and record the dropped recipients in the report.
+
+    Args:
+        campaign (str): id of the campaign.
+        users (list): the Contact records of the recipients.
+        msgs (dict): the message of each recipient keyed by contact key, or None if every recipient gets the same message.
+        report (SendReport): the report of the campaign.
+        workers (int, optional): number of browsers sending at the same time, for the estimate. Defaults to 1.
+
+    Returns:
+        SendPlan: the plan.
+    """
+    plan = plan_sends(users, msgs, workers=workers)
+    print(f"Campaign {campaign}")
+    plan.print_summary()
+    for key, reason in plan.rejected.items():
+        report.record(key, FAILED, SendError(INVALID_NUMBER, reason))
+    for key in plan.duplicates:
+        report.record(key, SKIPPED)
+    if DRY_RUN:
+        print("Dry run, nothing was sent.")
+    return plan
+
+
+def run_campaign(campaign: str, jobs: list, msgs: dict, session=None, workers=MAX_WORKERS, prepare=None):
+    """Run send jobs through the durable send queue, so an interrupted campaign resumes where it stopped.
+
+    The recipients are checked first (see planner.plan_sends): invalid, known unregistered and duplicate numbers are dropped before any browser is launched, and with WPP_DRY_RUN=1 nothing is sent at all. Once there is something left to send, the session's Chrome is launched in the background while prepare runs. Every job is then recorded in the queue (contact key and message hash) before sending and marked as sent once its task succeeds. Jobs that an earlier run of the same campaign already sent are skipped.
+
+    Args:
+        campaign (str): id of the campaign; running the same id again resumes it e.g., "bday:2024-05-14".
+        jobs (list): (user, task) pairs where task(session, user) sends to one contact.
+        msgs (dict): the message sent to each contact, keyed by contact key.
+        session (WhatsAppSession, optional): the session used when sending sequentially. If None, one is created and closed at the end of the run. Defaults to None.
+        workers (int, optional): number of browsers sending at the same time; 1 sends sequentially. Defaults to MAX_WORKERS.
+        prepare (callable, optional): called without arguments once there is something left to send, before sending e.g., to download attachments. Defaults to None.
+
+    Returns:
+        SendReport: the outcome of every job, keyed by contact key.
+    """
+    report = SendReport()
+    plan = plan_campaign(campaign, [user for user, _ in jobs], msgs, report, workers=workers)
+    if DRY_RUN or not plan.recipients:
+        return report
+    planned = plan.keys
+    jobs = [(user, task) for user, task in jobs if user.key in planned]
+    hashes = {key: message_hash(msg) for key, msg in msgs.items() if key in planned}
+    with SendQueue() as send_queue:
+        resumed = send_queue.has_campaign(campaign)
+        send_queue.enqueue(campaign, list(hashes.items()))
+        unsent = send_queue.unsent(campaign)
+
+        def queued_task(session, user, task):
+            send_queue.mark(campaign, user.key, hashes[user.key], IN_PROGRESS)
+            try:
+                task(session, user)
+            except Exception as e:
+                send_queue.mark(campaign, user.key, hashes[user.key], failed_queue_status(e))
+                raise
+            send_queue.mark(campaign, user.key, hashes[user.key], DONE)
+
+        queued_jobs = []
+        for user, task in jobs:
+            if unsent.get(user.key) == hashes[user.key]:
+                queued_jobs.append((user, lambda session, user, task=task: queued_task(session, user, task)))
+            else:
+                report.record(user.key, SKIPPED)
+        if resumed:
+            print(f"Resuming {campaign}: {len(jobs) - len(queued_jobs)} msg(s) already sent")
+        if not queued_jobs:
+            return report
+        if session is not None:
+            session.start_in_background()
+        if prepare is not None:
+            prepare()
+        report.merge(run_send_jobs(queued_jobs, session=session, workers=workers))
+    return report
+
+
+def type_msg(element, msg: str):
+    """Type a message into a text box, with Shift+Enter for line breaks so the message is not sent line by line.
+
+    Args:
+        element (WebElement): the text box.
+        msg (str): the message.
+    """
+    from selenium.webdriver.common.keys import Keys
+    for i, line in enumerate(msg.split("\n")):
+        if i:
+            element.send_keys(Keys.SHIFT, Keys.ENTER)
+        element.send_keys(line)
+
+
+@timed("group_send")
+def send_to_group(session, group: str, msg: str):
+    """Send a message to a group chat, found by its name in the chat list.
+
+    Args:
+        session (WhatsAppSession): the browser session to send with.
+        group (str): name of the group chat, as shown in WhatsApp.
+        msg (str): the message.
+    """
+    driver = session.start()
+    driver.get(session.base_url)
+    search = find_element(driver, "chat_search_box", STEP_TIMEOUTS["chat_load"] * 3)
+    search.send_keys(group)
+    find_element(driver, "chat_search_result", STEP_TIMEOUTS["chat_load"], title=css_string(group)).click()
+    type_msg(find_element(driver, "composer", STEP_TIMEOUTS["chat_load"]), msg)
+    click_send_btn(driver=driver)
+
+
+@timed("forward")
+def forward_last_msg(driver, recipients: list):
+    """Forward the last message sent in the open chat to several contacts at once through WhatsApp Web's forward dialog.
+
+    Each recipient is searched by phone number and only selected if the search result shows their full number or has their exact name as its title, so a message is never forwarded to the wrong chat. Recipients that are not found (e.g., numbers not saved in the phone's contacts) are returned so they can be sent to one chat at a time instead.
+
+    Args:
+        driver (WebDriver): The Chrome WebDriver object showing the chat of the message.
+        recipients (list): Contact records, at most FORWARD_LIMIT.
+
+    Returns:
+        list: the recipients that could not be selected.
+
+    Raises:
+        SendError: with reason UNCONFIRMED if the forward was sent but the dialog did not close, so the selected recipients may have got the message; its not_found attribute lists the others. Any other error is raised before the forward is sent.
+    """
+    import re
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.common.action_chains import ActionChains
+    from selenium.webdriver.support.wait import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    bubble = driver.find_elements(By.CSS_SELECTOR, selector_group("outgoing_msg"))[-1]
+    ActionChains(driver).move_to_element(bubble).perform()
+    find_element(driver, "msg_context_menu", STEP_TIMEOUTS["attach_menu"]).click()
+    find_element(driver, "forward_menu_item", STEP_TIMEOUTS["attach_menu"]).click()
+    find_element(driver, "forward_btn", STEP_TIMEOUTS["attach_menu"]).click()
+
+    not_found = []
+    for user in recipients:
+        search = find_element(driver, "forward_search_box", STEP_TIMEOUTS["attach_menu"])
+        search.send_keys(Keys.CONTROL, "a")
+        search.send_keys(Keys.BACKSPACE)
+        search.send_keys(user.phone)
+        digits = re.sub(r"\D", "", user.phone)
+
+        name = user.name.strip().lower()
+
+        def result_of_user(driver):
+            row = match_element(driver, "forward_search_result")
+            if row is None:
+                return False
+            if digits and digits in re.sub(r"\D", "", row.text):
+                return row
+            # A saved contact is shown by name only: the title must be the whole name, as a part of it (or an empty name) matches other chats.
+            titles = [span.get_attribute("title") or "" for span in row.find_elements(By.CSS_SELECTOR, "span[title]")]
+            return row if name and name in [title.strip().lower() for title in titles] else False
+
+        try:
+            WebDriverWait(driver, STEP_TIMEOUTS["attach_menu"], poll_frequency=0.2).until(result_of_user).click()
+        except TimeoutException:
+            not_found.append(user)
+
+    if len(not_found) == len(recipients):
+        ActionChains(driver).send_keys(Keys.ESCAPE).perform()
+        return not_found
+    find_element(driver, "forward_send_btn", STEP_TIMEOUTS["attach_menu"]).click()
+    try:
+        WebDriverWait(driver, STEP_TIMEOUTS["send_confirm"], poll_frequency=0.2).until(
+            lambda driver: match_element(driver, "forward_search_box") is None,
+            message="The forward dialog did not close")
+    except Exception as e:
+        error = SendError(UNCONFIRMED, f"forward sent but not confirmed: {e}")
+        error.not_found = not_found
+        raise error from e
+    return not_found
+
+
+def run_broadcast(campaign: str, recipients: list, msg: str, session=None):
+    """Send the same message to many contacts with a handful of UI operations: the message is sent to the first recipient's chat, then forwarded from there to the others, FORWARD_LIMIT chats at a time.
+
+    The run goes through the durable send queue like run_campaign. Recipients the forward dialog cannot find, and the recipients of a forward that failed before it was sent, are sent to one chat at a time instead. The recipients of a forward that was sent but not confirmed are marked as unconfirmed and never messaged again. WhatsApp shows forwarded messages with a "Forwarded" label.
+
+    Args:
+        campaign (str): id of the campaign; running the same id again resumes it.
+        recipients (list): the Contact records.
+        msg (str): the message, the same for every recipient.
+        session (WhatsAppSession, optional): the browser session to send with. If None, one is created and closed at the end of the run. Defaults to None.
+
+    Returns:
+        SendReport: the outcome of every recipient, keyed by contact key.
+    """
+    if session is None:
+        with WhatsAppSession() as session:
+            return run_broadcast(campaign, recipients, msg, session=session)
+    report = SendReport()
+    plan = plan_campaign(campaign, recipients, None, report)
+    if DRY_RUN:
+        return report
+    recipients = plan.recipients
+    msg_hash = message_hash(msg)
+    with SendQueue() as send_queue:
+        send_queue.enqueue(campaign, [(user.key, msg_hash) for user in recipients])
+        unsent = send_queue.unsent(campaign)
+        pending = [user for user in recipients if user.key in unsent]
+        for user in recipients:
+            if user.key not in unsent:
+                report.record(user.key, SKIPPED)
+
+        # The first recipient that can be messaged in their own chat hosts the message to forward.
+        fallback = []
+        while pending:
+            user = pending.pop(0)
+            send_queue.mark(campaign, user.key, msg_hash, IN_PROGRESS)
+            try:
+                send_with_retry(lambda session, user, done=set(): send_txtmsg(user, msg, session=session, done=done), session, user)
+            except Exception as e:
+                send_queue.mark(campaign, user.key, msg_hash, failed_queue_status(e))
+                report.record(user.key, FAILED, e)
+                continue
+            send_queue.mark(campaign, user.key, msg_hash, DONE)
+            report.record(user.key, SENT)
+            break
+
+        for i in range(0, len(pending), FORWARD_LIMIT):
+            batch = pending[i:i + FORWARD_LIMIT]
+            for user in batch:
+                send_queue.mark(campaign, user.key, msg_hash, IN_PROGRESS)
+            try:
+                not_found = forward_last_msg(session.driver, batch)
+            except Exception as e:
+                if classify_send_error(e) == UNCONFIRMED:
+                    print(f"Forwarding to {len(batch)} chat(s) was not confirmed, not sending it again: {e}")
+                    metrics.inc("forward_unconfirmed")
+                    for user in batch:
+                        if user in e.not_found:
+                            fallback.append(user)
+                        else:
+                            send_queue.mark(campaign, user.key, msg_hash, QUEUE_UNCONFIRMED)
+                            report.record(user.key, FAILED, e)
+                    continue
+                print(f"Forwarding to {len(batch)} chat(s) failed, sending one chat at a time: {e}")
+                metrics.inc("forward_failed")
+                not_found = batch
+            for user in batch:
+                if user in not_found:
+                    fallback.append(user)
+                else:
+                    send_queue.mark(campaign, user.key, msg_hash, DONE)
+                    report.record(user.key, SENT)
+            metrics.inc("msgs_forwarded", len(batch) - len(not_found))
+
+    if fallback:
+        jobs = [(user, lambda session, user, done=set(): send_txtmsg(user, msg, session=session, done=done)) for user in fallback]
+        report.merge(run_campaign(campaign, jobs, {user.key: msg for user in fallback}, session=session, workers=1))
+    return report
+
+
+def send_group_campaign(campaign: str, group: str, msg: str, session=None):
+    """Send a message to a group chat once, through the durable send queue so a resumed campaign does not post it twice.
+
+    Args:
+        campaign (str): id of the campaign.
+        group (str): name of the group chat.
+        msg (str): the message.
+        session (WhatsAppSession, optional): the browser session to send with. If None, one is created and closed at the end of the run. Defaults to None.
+
+    Returns:
+        SendReport: the outcome, keyed by "group:<name>".
+    """
+    if session is None:
+        with WhatsAppSession() as session:
+            return send_group_campaign(campaign, group, msg, session=session)
+    report = SendReport()
+    key = f"group:{group}"
+    msg_hash = message_hash(msg)
+    with SendQueue() as send_queue:
+        send_queue.enqueue(campaign, [(key, msg_hash)])
+        if key not in send_queue.unsent(campaign):
+            report.record(key, SKIPPED)
+            return report
+        send_queue.mark(campaign, key, msg_hash, IN_PROGRESS)
+        try:
+            send_to_group(session, group, msg)
+        except Exception as e:
+            send_queue.mark(campaign, key, msg_hash, failed_queue_status(e))
+            report.record(key, FAILED, SendError(classify_send_error(e, session), str(e)))
+            return report
+        send_queue.mark(campaign, key, msg_hash, DONE)
+        report.record(key, SENT)
+    return report
+
+
+def send_bday_msgs_from_local(user_list, msg, session=None, workers=MAX_WORKERS, dates=None):
     """Send customized automated birthday messages to a list of contacts
 
     Args:
         user_list (dict): the contact list to go through in order to send automated messages.
+        msg (str or MessageTemplate): the birthday message template.
+        session (WhatsAppSession, optional): the browser session shared by every message of this run. If None, one is created and closed at the end of the run. Defaults to None.
+        workers (int, optional): number of browsers sending at the same time. Defaults to MAX_WORKERS.
+        dates (list, optional): the dates whose celebrants are greeted (see run_bday_campaign). Defaults to today.
 
     Returns:
         dict: updated contact list.
     """
-    current_date = generate_cur_date()["current date"]
-    updated_data = {}
-    for user in user_list:
-        msg_new = msg.replace("zzzz", user[1])
-        
-        # check leap year
-        if is_leap_year(current_date.year):
-            # If today is 02-29, consider it as 02-28 for comparison
-            if current_date.month == 2 and current_date.day == 29:
-                current_date = dt.date(current_date.year, 2, 28)
-            # Adjust the birthdate if it's 02-29 in a non-leap year
-            if not is_leap_year(user[3].year):
-                user[3] = datetime.date(user[3].year, 2, 28)
-        
-        # If bday matches:
-        if current_date == user[3]:
-            send_txtmsg(user, msg_new)
-            send_photo(user)
-            updated_data = update_year_in_local(user)
-            print(f"It is {user[1]}'s bday today! Msg sent")
-        else:
-            print(f"NOT {user[1]}'s bday today")
-    return updated_data
+    bday_index = build_bday_index(user_list)
+    return run_bday_campaign("local", lambda current_date: find_bday_celebrants(bday_index, current_date),
+                             msg, session=session, workers=workers, dates=dates)
 
 
-def send_bday_msgs_from_cloud(user_list, msg: str):
+def send_bday_msgs_from_cloud(user_list, msg, session=None, workers=MAX_WORKERS, dates=None):
     """Send customized automated birthday messages to a list of contacts.
 
     Args:
-        user_list (dict): the contact list to go through in order to send automated messages.
+        user_list (dict): the contact list to go through in order to send automated messages. If None, only today's celebrants are queried from Azure Cosmos DB for MongoDB.
+        msg (str or MessageTemplate): the birthday message template.
+        session (WhatsAppSession, optional): the browser session shared by every message of this run. If None, one is created and closed at the end of the run. Defaults to None.
+        workers (int, optional): number of browsers sending at the same time. Defaults to MAX_WORKERS.
+        dates (list, optional): the dates whose celebrants are greeted (see run_bday_campaign). Defaults to today.
 
     Returns:
         dict: updated contact list.
     """
-    current_date = generate_cur_date()["current date"]
-    updated_data = {}
-    for user in user_list:
-        # msg = f"Happy Birthday {user[1]}! Hope you have a good one!"
-        msg_new = msg.replace("zzzz", user[1])
-
-        # If bday matches:
-        if current_date == user[3]:
-            send_txtmsg(user, msg_new)
-            send_photo(user)
-            updated_data = update_year_in_cloud(user)
-            print(f"It is {user[1]}'s bday today! Msg sent")
-        else:
-            print(f"NOT {user[1]}'s bday today")
+    if user_list is None:
+        find_celebrants = generate_bday_users_from_mongodb
+    else:
+        bday_index = build_bday_index(user_list)
+        find_celebrants = lambda current_date: find_bday_celebrants(bday_index, current_date)
+    return run_bday_campaign("cloud", find_celebrants, msg, session=session, workers=workers, dates=dates)
+
+
+def run_bday_campaign(target: str, find_celebrants, msg, session=None, workers=MAX_WORKERS, dates=None):
+    """Send the birthday greetings of one or more dates and record the birthday year updates of the contacts greeted.
+
+    A contact is only a celebrant while their stored year is the year of their birthday, so a date on which no run happened (e.g., while the daemon was stopped) has to be caught up by passing it in dates, or its celebrants are never greeted. Each date is its own campaign "bday:<date>".
+
+    Args:
+        target (str): where the birthdays are written back, "local" or "cloud".
+        find_celebrants (callable): returns the Contact records of the celebrants of a date. Called after the journal of an interrupted run is replayed, so those contacts already have their new birthday year.
+        msg (str or MessageTemplate): the birthday message template.
+        session (WhatsAppSession, optional): the browser session shared by every message of this run. If None, one is created and closed at the end of the run. Defaults to None.
+        workers (int, optional): number of browsers sending at the same time. Defaults to MAX_WORKERS.
+        dates (list, optional): the dates (datetime.date) whose celebrants are greeted, oldest first. Defaults to today.
+
+    Returns:
+        dict: updated contact list.
+    """
+    dates = dates or [generate_cur_date()["current date"]]
+    replayed = replay_bday_journal()
+    journal = BdayUpdateJournal(target)
+    template = compile_template(msg)
+    # The photos are only downloaded once a campaign has recipients, while Chrome launches.
+    photos = {}
+
+    def download_photos():
+        if not photos:
+            photos.update(get_bday_photos())
+
+    greeted = False
+    try:
+        for current_date in dates:
+            celebrants = [user for user in find_celebrants(current_date) if user.key not in replayed]
+            if not celebrants:
+                continue
+            greeted = True
+            msgs = template.render_all(celebrants)
+            # done is shared by the retries of a job, so a retry does not send the text again after the photo failed.
+            jobs = [(user, lambda session, user, done=set(): send_bday_greeting(session, user, msgs[user.key], journal=journal, done=done, photo=select_attachment(user, photos))) for user in celebrants]
+            report = run_campaign(f"bday:{current_date}", jobs, msgs, session=session, workers=workers, prepare=download_photos)
+            for user in celebrants:
+                if report.results.get(user.key) == SENT:
+                    print(f"It is {user.name}'s bday on {current_date}! Msg sent")
+            report.print_summary()
+    finally:
+        updated_data = journal.flush()
+    if not greeted:
+        print("No bdays today!")
     return updated_data
 
 
-def send_holiday_msgs(user_list):   
-    """Send Xmas and NY messages to a list of contacts.
+def holidays_today():
+    """Look up the holidays falling on today's date in the holiday calendar. Nothing is loaded or launched, so callers can skip loading the contacts on a day without a holiday.
+
+    Returns:
+        list: today's Holiday objects, empty if there is no holiday today.
+    """
+    return default_calendar.holidays_on(generate_cur_date()["current date"])
+
+
+def send_holiday_msgs(user_list, session=None, workers=MAX_WORKERS):   
+    """Send the greetings of today's holidays (see holiday_calendar.py) to a list of contacts.
+
+    Every holiday is its own campaign and only goes to the contacts with one of its tags. The greetings are templates from the Blob "text" container, with built-in fallbacks.
 
     Args:
         user_list (dict): the contact list to go through in order to send automated messages.
+        session (WhatsAppSession, optional): the browser session shared by every message of this run. If None, one is created and closed at the end of the run. Defaults to None.
+        workers (int, optional): number of browsers sending at the same time. Defaults to MAX_WORKERS.
     """
     current_date = generate_cur_date()["current date"]
-    # current_date_to_compare = dt(int(dt.now().year), int(dt.now().month), int(dt.now().day)).date()
-    # TODO: get holiday messages from Azure Blob Storage.
-    for user in user_list:
-        if current_date == dt(int(dt.now().year), 12, 25).date():
-            msg = f"Merry Xmas {user[1]}! May your holidays be filled with joy and laughter."
-            send_txtmsg(user, msg)
-        elif current_date == dt(int(dt.now().year), 1, 1).date():
-            msg = f"Happy New Year {user[1]}! May your holidays be filled with joy and laughter. Wishing you a happy and prosperous New Year filled with joy and new beginnings!"
-            send_txtmsg(user, msg)
-        # elif current_date == current_date_to_compare:
-        #     msg = f"Happy {dt.now().strftime("%A")} {user[1]}! Hope you have a productive day!"
-        #     send_msg(user, msg)
-        else:
-            print("No holiday today!")
-            break
+    holidays = default_calendar.holidays_on(current_date)
+    if not holidays:
+        print("No holiday today!")
+        return
+    for holiday in holidays:
+        recipients = holiday.recipients(user_list)
+        print(f"{holiday.name}: {len(recipients)} recipient(s)")
+        if not recipients:
+            continue
+        msgs = load_template(holiday.template_blob, default=holiday.default_template).render_all(recipients)
+        jobs = [(user, lambda session, user, msgs=msgs, done=set(): send_txtmsg(user, msgs[user.key], session=session, done=done)) for user in recipients]
+        run_campaign(f"holiday:{holiday.key}:{current_date}", jobs, msgs, session=session, workers=workers).print_summary()
             
 
-def send_custom_msg(user_list: dict):
-    """Send customized messages (use placeholders for a person's name). Can be filtered through tag input.
+def send_custom_msg(user_list: dict, session=None, workers=MAX_WORKERS, msg=None, tag_filter=None, broadcast=False, group=None):
+    """Send customized messages (use placeholders such as {name} for a person's name, see template.py). Can be filtered through tag input.
     
-    Note: user[4] is the associated tag.
+    Note: user.tag is the associated tag.
 
     Args:
         user_list (dict): the contact list to go through in order to send automated messages.
+        session (WhatsAppSession, optional): the browser session shared by every message of this run. If None, one is created and closed at the end of the run. Defaults to None.
+        workers (int, optional): number of browsers sending at the same time. Defaults to MAX_WORKERS.
+        msg (str, optional): the message. If None, it is asked for on the command line. Defaults to None.
+        tag_filter (str, optional): the tag of the recipients or "all". If None, it is asked for on the command line. Defaults to None.
+        broadcast (bool, optional): send the message to the first recipient and forward it from there to the others (see run_broadcast) instead of visiting every chat. Defaults to False.
+        group (str, optional): name of a group chat to post the message to once, instead of messaging the contacts. Defaults to None.
     """
-    msg = generate_msg()
-    tag_filter = input("Enter a tag to send the msg to selected contacts or type 'all' to send to all:\n> ").lower()
+    if msg is None:
+        msg = generate_msg()
+    try:
+        template = MessageTemplate(msg)
+    except ValueError as e:
+        print(e)
+        return
+    if (broadcast or group) and not template.is_static:
+        print("A broadcast msg is the same for everyone, remove its placeholders!")
+        return
+    if group:
+        current_date = generate_cur_date()["current date"]
+        campaign = f"custom:{current_date}:{message_hash('group:' + group + msg)}"
+        send_group_campaign(campaign, group, template.static_text, session=session).print_summary()
+        return
+    if tag_filter is None:
+        tag_filter = input("Enter a tag to send the msg to selected contacts or type 'all' to send to all:\n> ")
+    tag_filter = tag_filter.lower()
+    if tag_filter.isspace() or not any(tag_filter == s for s in TAGS):
+        print("Enter a valid tag or 'all'!")
+        return
+    current_date = generate_cur_date()["current date"]
+    report = SendReport()
+    recipients = []
     for user in user_list:
-        msg_customized = msg.replace("zzzz", user[1])
-        if tag_filter == user[4]:
-            send_txtmsg(user, msg_customized)
-        if tag_filter == "all":
-            send_txtmsg(user, msg_customized)
-        if tag_filter.isspace() or not any(tag_filter == s for s in TAGS):
-            print("Enter a valid tag or 'all'!")
-            break
+        if tag_filter == user.tag or tag_filter == "all":
+            recipients.append(user)
+        else:
+            report.record(user.key, SKIPPED)
+    msgs = template.render_all(recipients)
+    jobs = [(user, lambda session, user, done=set(): send_txtmsg(user, msgs[user.key], session=session, done=done)) for user in recipients]
+    # Re-running the same msg to the same tag on the same day resumes the interrupted run instead of messaging everyone again.
+    campaign = f"custom:{current_date}:{message_hash(tag_filter + msg)}"
+    if broadcast:
+        report.merge(run_broadcast(campaign, recipients, template.static_text, session=session))
+    else:
+        report.merge(run_campaign(campaign, jobs, msgs, session=session, workers=workers))
+    report.print_summary()
         
 
-def increment_year(user: list):
+def increment_year(user: Contact):
     """Increment year by 1
 
+    The month and day of the stored birthday are kept, so a 29 Feb birthday celebrated on 28 Feb of a non-leap year is stored as 29 Feb again.
+
     Args:
-        user (list): a contact's details
+        user (Contact): a contact's details
 
     Returns:
         str: updated datetime in yyyy-mm-dd format
     """
-    data_split = user[3].strftime("%Y-%m-%d").split("-")
-    data_split_year_increment = str(int(data_split[0])+1)
-    data_split_month = data_split[1]
-    data_split_day = data_split[2]
-    return f"{data_split_year_increment}-{data_split_month}-{data_split_day}"
+    return f"{user.bday.year + 1}-{user.bday_month:02d}-{user.bday_day:02d}"
 
 
 def is_leap_year(year: int):
@@ -0,0 +1,230 @@
+"""Provides a worker pool that sends messages to a list of contacts with several Chrome instances in parallel.
+
+Each worker owns its own browser session (and therefore its own Chrome profile directory, as two Chrome instances cannot share a user-data-dir lock) and pulls recipients from a shared queue. A global rate limiter spaces out the sends of all workers together so the run stays under WhatsApp's throttling, and every outcome is collected into one SendReport.
+
+Note: WhatsApp Web only lets one window per linked device be active at a time, so each worker profile has to be linked as its own device (scan the QR code once in that worker's window). WhatsApp allows up to 4 linked devices, which is why the worker count is capped at MAX_WORKER_LIMIT.
+"""
+
+import os
+import queue
+import shutil
+import threading
+import time
+from const import PROFILE_PATH
+
+SENT = "sent"
+FAILED = "failed"
+SKIPPED = "skipped"
+MAX_WORKER_LIMIT = 4
+
+# Reasons a send to a recipient can fail. Transient ones are worth retrying.
+INVALID_NUMBER = "invalid_number"
+SELECTOR_TIMEOUT = "selector_timeout"
+UPLOAD_FAILED = "upload_failed"
+BROWSER_CRASH = "browser_crash"
+# An element was covered, went stale or disappeared while the browser itself is fine e.g., a click intercepted by an overlay.
+UI_ERROR = "ui_error"
+# The send button was clicked but the sent tick never showed: the message may or may not have gone out, so it is never sent again.
+UNCONFIRMED = "unconfirmed"
+UNKNOWN_ERROR = "error"
+TRANSIENT_FAILURES = {SELECTOR_TIMEOUT, UPLOAD_FAILED, BROWSER_CRASH, UI_ERROR}
+
+
+class SendError(Exception):
+    """Sending to a recipient failed for a known reason.
+    """
+
+    def __init__(self, reason: str, message=""):
+        """
+        Args:
+            reason (str): INVALID_NUMBER, SELECTOR_TIMEOUT, UPLOAD_FAILED, BROWSER_CRASH, UI_ERROR, UNCONFIRMED or UNKNOWN_ERROR.
+            message (str, optional): details of the failure. Defaults to "".
+        """
+        super().__init__(f"[{reason}] {message}")
+        self.reason = reason
+
+
+class RateLimiter:
+    """Allow at most a fixed number of operations per minute across all threads.
+    """
+
+    def __init__(self, per_minute: float):
+        self.interval = 60 / per_minute if per_minute else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the caller is allowed to perform the next operation.
+        """
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class SendReport:
+    """Thread-safe collection of the outcome of a send run, keyed by contact key.
+    """
+
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, key: str, status: str, error=None):
+        """Record the outcome for a contact.
+
+        Args:
+            key (str): The contact key e.g., "contact_00001".
+            status (str): SENT, FAILED or SKIPPED.
+            error (Exception, optional): The error that made the send fail. Defaults to None.
+        """
+        with self.lock:
+            self.results[key] = status
+            if error is not None:
+                self.errors[key] = error
+
+    def merge(self, other):
+        """Add the outcomes of another report to this one.
+
+        Args:
+            other (SendReport): The report to merge.
+        """
+        with self.lock:
+            self.results.update(other.results)
+            self.errors.update(other.errors)
+
+    def keys_with_status(self, status: str):
+        """Return the contact keys with a given outcome.
+
+        Args:
+            status (str): SENT, FAILED or SKIPPED.
+
+        Returns:
+            list: The contact keys.
+        """
+        return [key for key, value in self.results.items() if value == status]
+
+    @property
+    def sent(self):
+        return self.keys_with_status(SENT)
+
+    @property
+    def failed(self):
+        return self.keys_with_status(FAILED)
+
+    @property
+    def skipped(self):
+        return self.keys_with_status(SKIPPED)
+
+    def failure_reasons(self):
+        """Count the failures per reason.
+
+        Returns:
+            dict: number of failed recipients keyed by reason.
+        """
+        reasons = {}
+        for error in self.errors.values():
+            reason = getattr(error, "reason", UNKNOWN_ERROR)
+            reasons[reason] = reasons.get(reason, 0) + 1
+        return reasons
+
+    def print_summary(self):
+        """Print how many messages were sent, failed and skipped, along with the reason of each failure.
+        """
+        print(f"Sent: {len(self.sent)}, failed: {len(self.failed)}, skipped: {len(self.skipped)}")
+        for reason, count in self.failure_reasons().items():
+            print(f"\t{reason}: {count}")
+        for key, error in self.errors.items():
+            print(f"\t{key} failed: {error}")
+
+
+def create_worker_profile(worker_id: int):
+    """Return the Chrome profile directory of a worker, creating it as a copy of the main profile the first time.
+
+    Worker 0 uses the main profile directly. Chrome's lock files are not copied so the copy can be opened while the main profile is in use.
+
+    Args:
+        worker_id (int): Index of the worker.
+
+    Returns:
+        str: Absolute path to the worker's profile directory.
+    """
+    main_profile = os.path.join(os.getcwd(), PROFILE_PATH)
+    if worker_id == 0:
+        return main_profile
+    worker_profile = f"{main_profile}_worker{worker_id}"
+    if not os.path.exists(worker_profile) and os.path.exists(main_profile):
+        shutil.copytree(main_profile, worker_profile, ignore=shutil.ignore_patterns("Singleton*", "lockfile", "*.lock"))
+    return worker_profile
+
+
+def run_in_pool(jobs, session_factory, workers: int, sends_per_minute: float, session=None):
+    """Run send jobs with a pool of browser workers pulling from a shared queue.
+
+    A worker launches its browser before taking any job, and stops taking jobs once its browser cannot be launched again after a crash, leaving them to the healthy workers.
+
+    Args:
+        jobs (list): (user, task) pairs where task(session, user) sends to one contact and raises on failure.
+        session_factory (callable): Called with a worker's profile directory, returns a new browser session for that worker.
+        workers (int): Number of browsers to run at the same time (capped at MAX_WORKER_LIMIT and the number of jobs).
+        sends_per_minute (float): Global limit on the number of jobs started per minute by all workers together.
+        session (WhatsAppSession, optional): An existing session on the main profile, handed to worker 0 (and left open at the end of the run) instead of launching a 2nd Chrome on the locked profile. Defaults to None.
+
+    Returns:
+        SendReport: The outcome of every job, keyed by contact key.
+    """
+    report = SendReport()
+    job_queue = queue.Queue()
+    for job in jobs:
+        job_queue.put(job)
+    limiter = RateLimiter(sends_per_minute)
+
+    def start_browser(worker_id, worker_session):
+        try:
+            worker_session.start()
+            return True
+        except Exception as e:
+            print(f"Worker {worker_id} could not launch Chrome: {e}")
+            return False
+
+    def work(worker_id, worker_session):
+        if not start_browser(worker_id, worker_session):
+            return
+        while True:
+            try:
+                user, task = job_queue.get_nowait()
+            except queue.Empty:
+                return
+            limiter.acquire()
+            try:
+                task(worker_session, user)
+                report.record(user.key, SENT)
+            except Exception as e:
+                report.record(user.key, FAILED, e)
+                if not worker_session.is_alive():
+                    worker_session.quit()
+                    if not start_browser(worker_id, worker_session):
+                        return
+
+    def run_worker(worker_id):
+        # The caller's session stays open for its later runs; only the sessions created here are closed.
+        if worker_id == 0 and session is not None:
+            work(worker_id, session)
+            return
+        with session_factory(create_worker_profile(worker_id)) as worker_session:
+            work(worker_id, worker_session)
+
+    workers = max(1, min(workers, MAX_WORKER_LIMIT, job_queue.qsize()))
+    threads = [threading.Thread(target=run_worker, args=(worker_id,), daemon=True) for worker_id in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Jobs left over if every worker failed to launch its browser.
+    while not job_queue.empty():
+        user, _ = job_queue.get_nowait()
+        report.record(user.key, FAILED, RuntimeError("no browser worker available"))
+    return report